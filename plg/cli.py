@@ -1,28 +1,50 @@
 import asyncio
+import os
+import tempfile
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Optional
-import json
+from typing import Any, Coroutine, Iterator, Optional, TextIO, Tuple, TypeVar
+import sys
 
 import typer
 from rich import print
+from sqlalchemy.orm import selectinload
 from sqlmodel import select, Session
 
-from plg.export.markdown import render_tree_to_markdown
-from plg.export.mermaid import render_tree_to_mermaid
 from plg.models.db import get_session
 from plg.models.models import BranchNode, ContextBlock, Decision
-from plg.tools.analysis import annotate_branch
-from plg.tools.branching import generate_branches
-from plg.tools.context import collect_context, summarise_context
 from plg.tools.exceptions import MaxNodesExceededError
 from plg.tools.show import generate_tree_view
-from plg.tools.tree import expand_tree_bfs
+
+# Modules that pull in the LLM stack (openai, httpx, pydantic) are imported
+# inside the commands that need them, so commands like `show` and `--help`
+# start without paying for those imports.
+
+T = TypeVar("T")
 
 app = typer.Typer()
 
 
+def _run(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Runs a command's coroutine on a fresh event loop. The shared LLM client
+    is closed before the loop ends, so its connections never outlive it.
+    """
+
+    async def _main() -> T:
+        try:
+            return await coro
+        finally:
+            # Only commands that used the LLM have imported the factory.
+            factory = sys.modules.get("plg.llm.factory")
+            if factory is not None:
+                await factory.aclose_llm_client()
+
+    return asyncio.run(_main())
+
+
 class ExportFormat(str, Enum):
     markdown = "markdown"
     mermaid = "mermaid"
@@ -44,7 +66,6 @@ def _create_initial_decision(session: Session, context_data: dict) -> Decision:
     new_decision = Decision(text=text, context_blocks=context_blocks)
     session.add(new_decision)
     session.commit()
-    session.refresh(new_decision)
     return new_decision
 
 
@@ -52,11 +73,15 @@ async def _full_session_async(
     export_format: Optional[ExportFormat], max_depth: int, max_children: int
 ):
     """Orchestrates a full PLG session: collect -> expand -> export."""
+    from plg.tools.analysis import annotate_branch
+    from plg.tools.context import collect_context, summarise_context
+
     # Step 1: Collect Context
     print("\n[bold cyan]Step 1: Collect Initial Context[/bold cyan]")
     context_data = collect_context()
 
-    start_decision_id = None
+    # A single session is shared by every step of the pipeline, so the whole
+    # collect -> expand -> export -> show run reuses one connection.
     with get_session() as session:
         new_decision = _create_initial_decision(session, context_data)
         if new_decision.text.startswith("Initial context was empty"):
@@ -68,39 +93,38 @@ async def _full_session_async(
             summary = await summarise_context(new_decision.context_blocks)
             annotations = await annotate_branch(summary)
             new_decision.summary = summary
-            new_decision.tags = json.dumps(annotations)
+            new_decision.tags = annotations
             session.add(new_decision)
             session.commit()
-            session.refresh(new_decision)
 
         print("\n[bold green]Context saved as new Decision![/bold green]")
         print(f"  Decision ID: {new_decision.id}")
         start_decision_id = new_decision.id
 
-    # Step 2: Expand Tree
-    print("\n\n[bold cyan]Step 2: Expanding Decision Tree...[/bold cyan]")
-    try:
-        await _expand_async(start_decision_id, max_depth, max_children)
-    except MaxNodesExceededError as e:
-        print(f"\n[bold red]Stopping expansion:[/bold red] {e}")
-        print("The tree has been partially saved. You can view it with 'plg show'.")
+        # Step 2: Expand Tree
+        print("\n\n[bold cyan]Step 2: Expanding Decision Tree...[/bold cyan]")
+        try:
+            await _expand_async(start_decision_id, max_depth, max_children, session)
+        except MaxNodesExceededError as e:
+            print(f"\n[bold red]Stopping expansion:[/bold red] {e}")
+            print("The tree has been partially saved. You can view it with 'plg show'.")
 
-    # Step 3: Export Tree (if requested)
-    if export_format:
-        print("\n\n[bold cyan]Step 3: Exporting Tree...[/bold cyan]")
+        # Step 3: Export Tree (if requested)
+        if export_format:
+            print("\n\n[bold cyan]Step 3: Exporting Tree...[/bold cyan]")
 
-        sessions_dir = Path.home() / "plg_sessions"
-        sessions_dir.mkdir(exist_ok=True)
+            sessions_dir = Path.home() / "plg_sessions"
+            sessions_dir.mkdir(exist_ok=True)
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        extension = "md" if export_format == ExportFormat.markdown else "mmd"
-        output_file = sessions_dir / f"session_{timestamp}.{extension}"
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            extension = "md" if export_format == ExportFormat.markdown else "mmd"
+            output_file = sessions_dir / f"session_{timestamp}.{extension}"
 
-        await _export_async(start_decision_id, output_file, export_format)
+            await _export_async(start_decision_id, output_file, export_format, session)
 
-    # Step 4: Display the final tree
-    print("\n\n[bold cyan]Step 4: Displaying Generated Tree...[/bold cyan]")
-    await _show_async(start_decision_id)
+        # Step 4: Display the final tree
+        print("\n\n[bold cyan]Step 4: Displaying Generated Tree...[/bold cyan]")
+        await _show_async(start_decision_id, session)
 
 
 @app.command()
@@ -126,15 +150,14 @@ def launch(
     Then, it will automatically expand the decision tree based on your input.
     Finally, it can optionally export the full tree to a file.
     """
-    asyncio.run(_full_session_async(export_format, max_depth, max_children))
+    _run(_full_session_async(export_format, max_depth, max_children))
 
 
-@app.command()
-def collect():
-    """
-    Runs the interactive context collection tool and saves the results
-    as a new Decision in the database.
-    """
+async def _collect_async():
+    """Async logic for the collect command."""
+    from plg.tools.analysis import annotate_branch
+    from plg.tools.context import collect_context, summarise_context
+
     context_data = collect_context()
 
     with get_session() as session:
@@ -146,15 +169,14 @@ def collect():
             return  # Exit early if there's nothing to summarize
 
         # Now, generate summary and annotations
-        summary = asyncio.run(summarise_context(new_decision.context_blocks))
-        annotations = asyncio.run(annotate_branch(summary))
+        summary = await summarise_context(new_decision.context_blocks)
+        annotations = await annotate_branch(summary)
 
         # Update the decision with the generated data
         new_decision.summary = summary
-        new_decision.tags = json.dumps(annotations)
+        new_decision.tags = annotations
         session.add(new_decision)
         session.commit()
-        session.refresh(new_decision)
 
         print("\n[bold green]Context saved and analyzed as new Decision![/bold green]")
         print(f"  Decision ID: {new_decision.id}")
@@ -162,23 +184,51 @@ def collect():
         print(f"  Summary: {summary}")
 
 
-async def _summarise_async(decision_id: int):
-    """Async logic for the summarise command."""
+@app.command()
+def collect():
+    """
+    Runs the interactive context collection tool and saves the results
+    as a new Decision in the database.
+    """
+    _run(_collect_async())
+
+
+async def _summarise_with_session(
+    session: Session, decision_id: int
+) -> Tuple[str, Decision]:
+    """
+    Loads a decision with its context blocks in one query and summarises it.
+
+    Returns:
+        A tuple of the summary and the loaded Decision.
+    """
+    from plg.tools.context import summarise_context
+
     print(f"Summarizing context for Decision ID: {decision_id}...")
-    with get_session() as session:
-        decision = session.get(Decision, decision_id)
-        if not decision:
-            print(f"[bold red]Error:[/bold red] Decision ID {decision_id} not found.")
-            raise typer.Exit(code=1)
+    decision = session.exec(
+        select(Decision)
+        .where(Decision.id == decision_id)
+        .options(selectinload(Decision.context_blocks))
+    ).first()
+    if not decision:
+        print(f"[bold red]Error:[/bold red] Decision ID {decision_id} not found.")
+        raise typer.Exit(code=1)
+
+    if not decision.context_blocks:
+        print("No context blocks found for this decision.")
+        # Return the decision text itself if no context to summarize
+        return decision.text, decision
 
-        if not decision.context_blocks:
-            print("No context blocks found for this decision.")
-            # Return the decision text itself if no context to summarize
-            return decision.text
+    summary = await summarise_context(decision.context_blocks)
+    print("\n[bold green]Generated Summary:[/bold green]")
+    print(summary)
+    return summary, decision
 
-        summary = await summarise_context(decision.context_blocks)
-        print("\n[bold green]Generated Summary:[/bold green]")
-        print(summary)
+
+async def _summarise_async(decision_id: int):
+    """Async logic for the summarise command."""
+    with get_session() as session:
+        summary, _ = await _summarise_with_session(session, decision_id)
         return summary
 
 
@@ -189,28 +239,26 @@ def summarise(
     """
     Summarises the context associated with a given Decision ID.
     """
-    asyncio.run(_summarise_async(decision_id))
+    _run(_summarise_async(decision_id))
 
 
 async def _branch_async(decision_id: int, max_children: int):
     """Async logic for the branch command."""
-    summary = await _summarise_async(decision_id)
-    if not summary:
-        print(
-            "[bold red]Error:[/bold red] Could not generate a summary to branch from."
-        )
-        raise typer.Exit(code=1)
+    from plg.tools.analysis import annotate_branch
+    from plg.tools.branching import generate_branches_with_annotations
 
     with get_session() as session:
-        parent_decision = session.get(Decision, decision_id)
-        if not parent_decision:
-            # This check is redundant if _summarise_async already did it,
-            # but it's good practice to be safe.
-            print(f"[bold red]Error:[/bold red] Decision ID {decision_id} not found.")
+        # The parent decision and its context blocks are loaded once and
+        # reused for both the summary and the branch generation.
+        summary, parent_decision = await _summarise_with_session(session, decision_id)
+        if not summary:
+            print(
+                "[bold red]Error:[/bold red] Could not generate a summary to branch from."
+            )
             raise typer.Exit(code=1)
 
         print(f"\nGenerating {max_children} branches for Decision ID: {decision_id}...")
-        branches = await generate_branches(
+        branches = await generate_branches_with_annotations(
             parent_summary=summary,
             context_blocks=parent_decision.context_blocks,
             max_children=max_children,
@@ -236,26 +284,29 @@ async def _branch_async(decision_id: int, max_children: int):
         for branch in branches:
             branch_text = branch["decision"]
             tradeoffs = branch["tradeoffs"]
-            annotations = await annotate_branch(branch_text)
+            # Tags normally arrive with the branch; only fill in missing ones.
+            annotations = branch["tags"] or await annotate_branch(branch_text)
 
             child_decision = Decision(
                 text=branch_text,
-                tradeoffs=json.dumps(tradeoffs),
-                tags=json.dumps(annotations),
+                tradeoffs=tradeoffs,
+                tags=annotations,
             )
             child_node = BranchNode(decision=child_decision, parent=parent_node)
             session.add(child_decision)
             session.add(child_node)
             new_decisions.append(child_decision)
 
+        # The session keeps objects loaded after a commit, so the new primary
+        # keys are read without reloading each row.
         session.commit()
+        new_decision_ids = [decision.id for decision in new_decisions]
 
         print(
-            f"\n[bold green]Saved {len(new_decisions)} new branches to the database.[/bold green]"
+            f"\n[bold green]Saved {len(new_decision_ids)} new branches to the database.[/bold green]"
         )
-        for decision in new_decisions:
-            session.refresh(decision)
-            print(f"  - Created Decision ID: {decision.id}")
+        for new_decision_id in new_decision_ids:
+            print(f"  - Created Decision ID: {new_decision_id}")
 
 
 @app.command()
@@ -269,11 +320,13 @@ def branch(
     Generates new parallel branches from a given Decision ID and saves them
     as new Decisions and BranchNodes in the database.
     """
-    asyncio.run(_branch_async(decision_id, max_children))
+    _run(_branch_async(decision_id, max_children))
 
 
 async def _annotate_async(decision_id: int):
     """Async logic for the annotate command."""
+    from plg.tools.analysis import annotate_decision
+
     print(f"Analyzing decision text for Decision ID: {decision_id}...")
     with get_session() as session:
         decision = session.get(Decision, decision_id)
@@ -281,7 +334,9 @@ async def _annotate_async(decision_id: int):
             print(f"[bold red]Error:[/bold red] Decision ID {decision_id} not found.")
             raise typer.Exit(code=1)
 
-        annotations = await annotate_branch(decision.text)
+        # Reuses the tags persisted on the decision; on a miss, the new
+        # annotations are stored on it and committed with the session.
+        annotations = await annotate_decision(decision)
 
         if not annotations:
             print(
@@ -301,16 +356,24 @@ def annotate(
     """
     Analyzes a given Decision's text to extract strategic tags.
     """
-    asyncio.run(_annotate_async(decision_id))
+    _run(_annotate_async(decision_id))
 
 
-async def _expand_async(decision_id: int, max_depth: int, max_children: int):
+async def _expand_async(
+    decision_id: int,
+    max_depth: int,
+    max_children: int,
+    session: Optional[Session] = None,
+):
     """Async logic for the expand command."""
+    from plg.tools.tree import expand_tree_bfs
+
     try:
         await expand_tree_bfs(
             start_decision_id=decision_id,
             max_depth=max_depth,
             max_children=max_children,
+            session=session,
         )
     except MaxNodesExceededError as e:
         print(f"\n[bold red]Stopping expansion:[/bold red] {e}")
@@ -332,14 +395,49 @@ def expand(
     """
     Automatically expands the decision tree from a starting decision.
     """
-    asyncio.run(_expand_async(decision_id, max_depth, max_children))
+    _run(_expand_async(decision_id, max_depth, max_children))
 
 
-async def _export_async(decision_id: int, output_file: Path, format: ExportFormat):
+@contextmanager
+def _replace_on_success(path: Path) -> Iterator[TextIO]:
+    """
+    Opens a temporary file next to `path` for writing, and moves it over
+    `path` only once the block completes. If writing fails or is
+    interrupted, an existing file at `path` is left untouched.
+    """
+    fd, tmp_name = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        # mkstemp creates the file private to the user; give it the
+        # permissions a plain `open(path, "w")` would have.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_name, 0o666 & ~umask)
+        with os.fdopen(fd, "w") as sink:
+            yield sink
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+async def _export_async(
+    decision_id: int,
+    output_file: Path,
+    format: ExportFormat,
+    session: Optional[Session] = None,
+    fresh: bool = False,
+):
     """Async logic for the export command."""
-    with get_session() as session:
+    from plg.export.markdown import write_tree_markdown
+    from plg.export.mermaid import render_tree_to_mermaid
+
+    with (
+        nullcontext(session) if session is not None else get_session()
+    ) as active_session:
         # Find the root node for the export
-        root_node = session.exec(
+        root_node = active_session.exec(
             select(BranchNode).where(BranchNode.decision_id == decision_id)
         ).first()
 
@@ -353,13 +451,18 @@ async def _export_async(decision_id: int, output_file: Path, format: ExportForma
             f"Exporting tree starting from Decision ID {decision_id} in {format.value} format..."
         )
 
-        content = ""
         if format == ExportFormat.markdown:
-            content = await render_tree_to_markdown(root_node.id, session)
+            # Markdown is streamed line by line into a temporary file, which
+            # only replaces the output once the whole tree has been written.
+            with _replace_on_success(output_file) as sink:
+                await write_tree_markdown(
+                    root_node.id, active_session, sink, force_reannotate=fresh
+                )
         elif format == ExportFormat.mermaid:
-            content = await render_tree_to_mermaid(root_node.id, session)
-
-        output_file.write_text(content)
+            content = await render_tree_to_mermaid(
+                root_node.id, active_session, force_reannotate=fresh
+            )
+            output_file.write_text(content)
         print(f"\n[bold green]Successfully exported tree to {output_file}[/bold green]")
 
 
@@ -377,18 +480,25 @@ def export(
         "-f",
         help="The output format for the exported tree.",
     ),
+    fresh: bool = typer.Option(
+        False,
+        "--fresh",
+        help="Re-annotate every decision instead of reusing saved tags.",
+    ),
 ):
     """
     Exports a decision tree to a markdown file.
     """
-    asyncio.run(_export_async(decision_id, output_file, format))
+    _run(_export_async(decision_id, output_file, format, fresh=fresh))
 
 
-async def _show_async(decision_id: int):
+async def _show_async(decision_id: int, session: Optional[Session] = None):
     """Async logic for the show command."""
-    with get_session() as session:
+    with (
+        nullcontext(session) if session is not None else get_session()
+    ) as active_session:
         # Find the root node for the tree
-        root_node = session.exec(
+        root_node = active_session.exec(
             select(BranchNode).where(BranchNode.decision_id == decision_id)
         ).first()
 
@@ -399,7 +509,7 @@ async def _show_async(decision_id: int):
             raise typer.Exit(code=1)
 
         print(f"Generating tree view for Decision ID {decision_id}...")
-        rich_tree = await generate_tree_view(root_node.id, session)
+        rich_tree = await generate_tree_view(root_node.id, active_session)
         print(rich_tree)
 
 
@@ -412,7 +522,7 @@ def show(
     """
     Shows a decision tree in the CLI.
     """
-    asyncio.run(_show_async(decision_id))
+    _run(_show_async(decision_id))
 
 
 if __name__ == "__main__":
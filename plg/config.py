@@ -1,22 +1,99 @@
+import os
+from dataclasses import dataclass
 from functools import lru_cache
+from typing import Any, Callable, Dict
 
+from dotenv import dotenv_values
 from pydantic import SecretStr
-from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
-class Settings(BaseSettings):
-    """Application settings, loaded from environment variables and .env files."""
+# Settings read from the environment as text and converted to numbers.
+_NUMERIC_FIELDS: Dict[str, Callable[[str], Any]] = {
+    "SEMANTIC_CACHE_THRESHOLD": float,
+    "OPENAI_RPM": int,
+    "OPENAI_TPM": int,
+    "OPENAI_REQUEST_TIMEOUT": float,
+}
+# Settings read from the environment as text and converted to booleans.
+_BOOLEAN_FIELDS = ("SEMANTIC_CACHE_ENABLED",)
+_TRUE_VALUES = ("1", "true", "yes", "on")
+_FALSE_VALUES = ("0", "false", "no", "off", "")
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Application settings, loaded from environment variables and .env files.
+
+    This is a plain frozen dataclass rather than a pydantic `BaseSettings`, so
+    short-lived CLI invocations don't pay for importing and building a
+    settings model just to read a handful of values.
+    """
 
     OPENAI_API_KEY: SecretStr
     LLM_PROVIDER: str = "openai"
     MODEL_NAME: str = "gpt-4-turbo-preview"
+    # Whether tagging prompts may be answered by the semantic cache. Off by
+    # default, since every exact-cache miss then costs an embeddings request.
+    SEMANTIC_CACHE_ENABLED: bool = False
+    # Minimum cosine similarity for a semantic cache hit on tagging prompts.
+    SEMANTIC_CACHE_THRESHOLD: float = 0.92
+    # The account's OpenAI rate limits, in requests and tokens per minute.
+    OPENAI_RPM: int = 500
+    OPENAI_TPM: int = 150_000
+    # Seconds before a single OpenAI request is abandoned. Long generations
+    # need the time, and timed-out requests are not retried.
+    OPENAI_REQUEST_TIMEOUT: float = 600.0
+
+    @classmethod
+    def from_env(cls, env_file: str = ".env") -> "Settings":
+        """
+        Builds the settings from the environment, falling back to values in
+        `env_file`. Environment variables take precedence over the file.
+
+        Raises:
+            ValueError: If OPENAI_API_KEY is not set, or a numeric or boolean
+                        setting cannot be parsed.
+        """
+        file_values = dotenv_values(env_file, encoding="utf-8")
+
+        def _get(name: str):
+            return os.environ.get(name, file_values.get(name))
+
+        api_key = _get("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError(
+                "OPENAI_API_KEY is not set. Add it to your environment or .env file."
+            )
 
-    model_config = SettingsConfigDict(
-        env_file=".env", env_file_encoding="utf-8", extra="ignore"
-    )
+        overrides: Dict[str, Any] = {
+            name: value
+            for name in ("LLM_PROVIDER", "MODEL_NAME")
+            if (value := _get(name)) is not None
+        }
+        for name, parse in _NUMERIC_FIELDS.items():
+            value = _get(name)
+            if value is None:
+                continue
+            try:
+                overrides[name] = parse(value)
+            except ValueError:
+                raise ValueError(f"{name} must be a number, got '{value}'.") from None
+        for name in _BOOLEAN_FIELDS:
+            value = _get(name)
+            if value is None:
+                continue
+            flag = value.strip().lower()
+            if flag in _TRUE_VALUES:
+                overrides[name] = True
+            elif flag in _FALSE_VALUES:
+                overrides[name] = False
+            else:
+                raise ValueError(f"{name} must be true or false, got '{value}'.")
+        return cls(OPENAI_API_KEY=SecretStr(api_key), **overrides)
 
 
 @lru_cache()
 def get_settings() -> Settings:
     """Return a cached instance of the application settings."""
-    return Settings()  # type: ignore[call-arg]
+    return Settings.from_env()
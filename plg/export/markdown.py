@@ -1,54 +1,90 @@
+from typing import Any, Dict, List, TextIO, Tuple
+
 from sqlmodel import Session
 
 from plg.models.models import BranchNode
-from plg.tools.analysis import annotate_branch
+from plg.models.queries import Subtree, load_subtree
+from plg.tools.analysis import annotate_decisions
 
 
-async def _build_markdown_level(node: BranchNode, level: int) -> str:
+def _walk_preorder(subtree: Subtree) -> List[Tuple[BranchNode, int]]:
     """
-    Recursively builds a markdown string for a single node and its children.
-    This function assumes the node is attached to an active database session.
+    Returns `(node, level)` pairs for every node of the subtree that has a
+    decision, in the depth-first order they appear in the document. An
+    explicit stack is used instead of recursion, so deep trees can't hit the
+    recursion limit.
     """
-    if not node.decision:
-        return ""
+    ordered: List[Tuple[BranchNode, int]] = []
+    stack = [(subtree.root, 0)]
+    while stack:
+        node, level = stack.pop()
+        if not node.decision:
+            continue
+        ordered.append((node, level))
+        # Push children in reverse so they are popped in their original order.
+        for child_node in reversed(subtree.children(node)):
+            stack.append((child_node, level + 1))
+    return ordered
+
 
-    # 1. Get the decision text and annotations for the current node.
+def _write_markdown_entry(
+    node: BranchNode, level: int, annotations: Dict[str, Any], sink: TextIO
+) -> None:
+    """Writes the markdown lines for a single node to `sink`."""
     decision_text = node.decision.text
-    annotations = await annotate_branch(decision_text)
     risk = annotations.get("risk", "N/A")
     growth = annotations.get("growth", "N/A")
     emotion = annotations.get("emotion", "N/A")
 
-    # 2. Format the current node's markdown entry.
     indent = "  " * level
-    md_parts = [
-        f"{indent}- **Decision (ID: {node.decision_id})**: {decision_text}",
-        f"{indent}  - *Tags: [Risk: {risk}] [Growth: {growth}] [Emotion: {emotion}]*",
-    ]
-
-    # 3. Recursively call for children. The lazy-load of `node.children` will
-    #    work because the session remains open during the entire process.
-    for child_node in node.children:
-        md_parts.append(await _build_markdown_level(child_node, level + 1))
-
-    return "\n".join(md_parts)
+    sink.write(f"{indent}- **Decision (ID: {node.decision_id})**: {decision_text}\n")
+    sink.write(
+        f"{indent}  - *Tags: [Risk: {risk}] [Growth: {growth}] [Emotion: {emotion}]*\n"
+    )
 
 
-async def render_tree_to_markdown(start_node_id: int, session: Session) -> str:
+async def write_tree_markdown(
+    start_node_id: int,
+    session: Session,
+    sink: TextIO,
+    max_workers: int = 8,
+    force_reannotate: bool = False,
+) -> None:
     """
-    Renders a decision tree starting from a given node into a markdown string.
+    Writes a decision tree starting from a given node as markdown to `sink`,
+    line by line, without building the whole document in memory.
+
+    All nodes are annotated up front with a single bulk call before the tree
+    is written.
 
     Args:
         start_node_id: The ID of the BranchNode to start the export from.
         session: The active database session.
-
-    Returns:
-        A string containing the full markdown representation of the tree.
+        sink: A writable text stream, such as an open file.
+        max_workers: The maximum number of concurrent annotation calls if the
+                     bulk annotation falls back to per-node calls.
+        force_reannotate: If True, ignore persisted tags and re-annotate every
+                          node. By default only unannotated nodes reach the LLM.
     """
-    start_node = session.get(BranchNode, start_node_id)
-    if not start_node:
-        return "Error: Start node not found."
+    # The whole subtree is loaded with one query, so neither pass below
+    # triggers any lazy loads.
+    subtree = load_subtree(session, start_node_id)
+    if not subtree:
+        sink.write("Error: Start node not found.")
+        return
+
+    # 1. Order the nodes as they appear in the document and annotate them.
+    ordered = _walk_preorder(subtree)
+    annotations = await annotate_decisions(
+        [node.decision for node, _ in ordered],
+        max_workers=max_workers,
+        force_reannotate=force_reannotate,
+    )
+
+    # 2. Write the document.
+    sink.write(
+        f"# Decision Tree Export\n\nStarting from Decision ID: {subtree.root.decision_id}\n\n"
+    )
+    for (node, level), node_annotations in zip(ordered, annotations):
+        _write_markdown_entry(node, level, node_annotations, sink)
 
-    header = f"# Decision Tree Export\n\nStarting from Decision ID: {start_node.decision_id}\n\n"
-    tree_md = await _build_markdown_level(start_node, 0)
-    return header + tree_md
@@ -1,57 +1,91 @@
+from collections import deque
+from typing import Dict, Set, Tuple
+
 from sqlmodel import Session
 
-from plg.models.models import BranchNode
-from plg.tools.analysis import annotate_branch
+from plg.models.queries import load_subtree
+from plg.tools.analysis import annotate_decisions
+
+# Characters that must be escaped in Mermaid labels, mapped to their entities.
+_LABEL_ESCAPES = str.maketrans({'"': "#quot;"})
 
 
-async def render_tree_to_mermaid(start_node_id: int, session: Session) -> str:
+async def render_tree_to_mermaid(
+    start_node_id: int,
+    session: Session,
+    max_workers: int = 8,
+    force_reannotate: bool = False,
+) -> str:
     """
     Renders a decision tree starting from a given node into a Mermaid graph string.
 
-    This function uses a Breadth-First Search (BFS) to traverse the tree
-    and build the graph definition.
+    This function uses a Breadth-First Search (BFS) to collect the nodes of
+    the tree, annotates them with a single bulk call, and then builds the
+    graph definition.
 
     Args:
         start_node_id: The ID of the BranchNode to start the export from.
         session: The active database session.
+        max_workers: The maximum number of concurrent annotation calls if the
+                     bulk annotation falls back to per-node calls.
+        force_reannotate: If True, ignore persisted tags and re-annotate every
+                          node. By default only unannotated nodes reach the LLM.
 
     Returns:
         A string containing the full Mermaid graph definition.
     """
-    start_node = session.get(BranchNode, start_node_id)
-    if not start_node:
+    # The whole subtree is loaded with one query, so the traversal below does
+    # not trigger any lazy loads.
+    subtree = load_subtree(session, start_node_id)
+    if not subtree:
         return "Error: Start node not found."
 
-    graph_lines = set()
-    queue = [start_node]
-    visited_nodes = set()
+    # 1. Collect every node of the tree.
+    nodes = []
+    queue = deque([subtree.root])
 
     while queue:
-        node = queue.pop(0)
-        if node.id in visited_nodes or not node.decision:
+        node = queue.popleft()
+        if not node.decision:
             continue
-        visited_nodes.add(node.id)
+        nodes.append(node)
+        queue.extend(subtree.children(node))
 
+    # 2. Annotate all nodes in one batch.
+    all_annotations = await annotate_decisions(
+        [node.decision for node in nodes],
+        max_workers=max_workers,
+        force_reannotate=force_reannotate,
+    )
+
+    # 3. Build the graph lines. Nodes and edges are deduplicated by their
+    #    integer decision IDs rather than by hashing the full label strings.
+    node_lines: Dict[int, str] = {}
+    edges: Set[Tuple[int, int]] = set()
+    for node, annotations in zip(nodes, all_annotations):
         # Sanitize decision text for Mermaid label
-        # Quotes must be replaced with the #quot; HTML entity.
-        decision_text = node.decision.text.replace('"', "#quot;")
-        annotations = await annotate_branch(decision_text)
+        # Quotes must be replaced with the #quot; HTML entity. Texts without
+        # a quote are used as-is, skipping the copy.
+        decision_text = node.decision.text
+        if '"' in decision_text:
+            decision_text = decision_text.translate(_LABEL_ESCAPES)
         risk = annotations.get("risk", "N/A")
         growth = annotations.get("growth", "N/A")
         emotion = annotations.get("emotion", "N/A")
 
-        node_id = f"D{node.decision_id}"
         node_label = (
             f'"{decision_text}<br/>'
             f'[Risk: {risk}] [Growth: {growth}] [Emotion: {emotion}]"'
         )
-        graph_lines.add(f"    {node_id}[{node_label}]")
+        node_lines.setdefault(
+            node.decision_id, f"    D{node.decision_id}[{node_label}]"
+        )
 
-        for child_node in node.children:
-            child_id = f"D{child_node.decision_id}"
-            graph_lines.add(f"    {node_id} --> {child_id}")
-            queue.append(child_node)
+        for child_node in subtree.children(node):
+            edges.add((node.decision_id, child_node.decision_id))
 
-    # Sort lines for deterministic output, making it easier to test/compare
-    sorted_lines = "\n".join(sorted(list(graph_lines)))
+    # Sort by ID for deterministic output, making it easier to test/compare
+    lines = [node_lines[decision_id] for decision_id in sorted(node_lines)]
+    lines.extend(f"    D{parent} --> D{child}" for parent, child in sorted(edges))
+    sorted_lines = "\n".join(lines)
     return f"graph TD\n{sorted_lines}\n"
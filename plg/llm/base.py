@@ -1,12 +1,22 @@
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 
 class BaseLLMClient(ABC):
     """Abstract base class for a Large Language Model client."""
 
     @abstractmethod
-    async def acomplete(self, prompt: str, tools: Optional[List[Any]] = None) -> Any:
+    async def acomplete(
+        self,
+        prompt: str,
+        tools: Optional[List[Any]] = None,
+        use_cache: bool = False,
+        system: Optional[str] = None,
+        use_semantic_cache: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        validate: Optional[Callable[[str], bool]] = None,
+        cache_prompt: Optional[str] = None,
+    ) -> Any:
         """
         Asynchronously generates a completion for a given prompt.
 
@@ -14,9 +24,37 @@ class BaseLLMClient(ABC):
             prompt: The text prompt to send to the model.
             tools: An optional list of tools the model can call. The structure
                    of a tool is specific to the implementing client.
+            use_cache: Whether a previously stored response for the same
+                       request may be returned. Only set this for idempotent
+                       requests, where an identical answer is acceptable.
+            system: Optional static instructions sent ahead of the prompt.
+                    Keep it identical across calls so providers can cache it.
+            use_semantic_cache: Whether a stored response for a prompt with
+                                the same meaning may be returned, even if the
+                                wording differs. Implies `use_cache`.
+            response_schema: An optional JSON schema the response content must
+                             conform to. When set, the content is plain JSON.
+            validate: An optional check of the response content. Only content
+                      it accepts is stored in, or returned from, a cache.
+            cache_prompt: The prompt to cache the response under, if it
+                          differs from `prompt`, e.g. for a retry that adds
+                          stricter instructions to the original prompt.
 
         Returns:
             The model's response. This could be a string with the text completion,
             or a structured object representing a tool call.
         """
         pass
+
+    async def aclose(self) -> None:
+        """
+        Releases any network resources held by the client. The default
+        implementation does nothing.
+        """
+        pass
+
+    async def __aenter__(self) -> "BaseLLMClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
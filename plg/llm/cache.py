@@ -0,0 +1,92 @@
+import datetime
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from plg.models import db
+from plg.models.models import LLMCacheEntry
+
+DEFAULT_TTL = datetime.timedelta(days=7)
+
+
+def make_cache_key(
+    model: str,
+    prompt: str,
+    tools: Optional[List[Any]] = None,
+    system: Optional[str] = None,
+    response_schema: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Returns a deterministic SHA-256 key for an LLM request."""
+    payload = json.dumps(
+        {
+            "model": model,
+            "system": system,
+            "prompt": prompt,
+            "tools": tools,
+            "response_schema": response_schema,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMCache:
+    """
+    A persistent cache of LLM responses, stored in the application's SQLite
+    database so repeated identical requests are answered without an API call.
+    """
+
+    def __init__(
+        self, engine: Optional[Engine] = None, ttl: datetime.timedelta = DEFAULT_TTL
+    ) -> None:
+        self.engine = engine or db.engine
+        self.ttl = ttl
+        self._table_ready = False
+
+    def _ensure_table(self) -> None:
+        """Creates the cache table on first use, including in existing databases."""
+        if not self._table_ready:
+            LLMCacheEntry.__table__.create(self.engine, checkfirst=True)  # type: ignore[attr-defined]
+            self._table_ready = True
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached response JSON for a key, or None if missing or expired."""
+        self._ensure_table()
+        with Session(self.engine) as session:
+            entry = session.get(LLMCacheEntry, key)
+            if entry is None:
+                return None
+            expires_at = entry.created_at + datetime.timedelta(
+                seconds=entry.ttl_seconds
+            )
+            if expires_at < datetime.datetime.utcnow():
+                session.delete(entry)
+                session.commit()
+                return None
+            return entry.response_json
+
+    def delete(self, key: str) -> None:
+        """Removes the entry for a key, if there is one."""
+        self._ensure_table()
+        with Session(self.engine) as session:
+            entry = session.get(LLMCacheEntry, key)
+            if entry is not None:
+                session.delete(entry)
+                session.commit()
+
+    def set(self, key: str, model: str, response_json: str) -> None:
+        """Stores a response, replacing any previous entry for the key."""
+        self._ensure_table()
+        with Session(self.engine) as session:
+            session.merge(
+                LLMCacheEntry(
+                    key=key,
+                    model=model,
+                    response_json=response_json,
+                    ttl_seconds=int(self.ttl.total_seconds()),
+                )
+            )
+            session.commit()
@@ -1,13 +1,20 @@
+from functools import lru_cache
+
 from plg.config import get_settings
 from plg.llm.base import BaseLLMClient
 from plg.llm.openai_client import OpenAIClient
 
 
+@lru_cache(maxsize=1)
 def get_llm_client() -> BaseLLMClient:
     """
     Factory function to get the appropriate LLM client based on the
     configured provider.
 
+    The client is created once and shared, so all LLM calls within an event
+    loop reuse the same HTTP connection pool. Call `aclose_llm_client` before
+    the loop finishes to release it.
+
     Raises:
         NotImplementedError: If the configured LLM_PROVIDER is not supported.
 
@@ -19,7 +26,23 @@ def get_llm_client() -> BaseLLMClient:
 
     if provider == "openai":
         return OpenAIClient()
+    if provider == "openai_batch":
+        # Imported lazily, since interactive runs never need it.
+        from plg.llm.openai_batch_client import BatchOpenAIClient
+
+        return BatchOpenAIClient()
 
     raise NotImplementedError(
         f"The LLM provider '{settings.LLM_PROVIDER}' is not supported."
     )
+
+
+async def aclose_llm_client() -> None:
+    """
+    Closes the shared LLM client, if one was created, and forgets it so the
+    next call to `get_llm_client` builds a fresh one.
+    """
+    if get_llm_client.cache_info().currsize:
+        client = get_llm_client()
+        get_llm_client.cache_clear()
+        await client.aclose()
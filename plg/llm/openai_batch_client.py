@@ -0,0 +1,211 @@
+import asyncio
+import json
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import openai
+from openai.types.chat import ChatCompletionMessage
+
+from plg.llm.openai_client import OpenAIClient
+
+T = TypeVar("T")
+
+_CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+# Batch statuses after which a batch will not change any more.
+_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+# Errors worth retrying when talking to the Files and Batches endpoints.
+_TRANSIENT_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class BatchOpenAIClient(OpenAIClient):
+    """
+    An LLM client that sends requests through OpenAI's Batch API.
+
+    Requests are buffered and submitted together as one batch once
+    `max_batch_size` requests are waiting or `flush_interval` seconds have
+    passed since the first one. Each `acomplete` call resolves when its batch
+    finishes, which can take minutes or hours, so this client is meant for
+    non-interactive runs where halved costs and the Batch API's separate
+    rate limits matter more than latency.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 100,
+        flush_interval: float = 2.0,
+        poll_interval: float = 30.0,
+        max_retries: int = 5,
+    ) -> None:
+        """
+        Initializes the client using credentials from settings.
+
+        Args:
+            max_batch_size: Submit the buffer as soon as it holds this many
+                            requests.
+            flush_interval: Seconds to wait for more requests before
+                            submitting a partially filled buffer.
+            poll_interval: Seconds between batch status checks.
+            max_retries: How often a transient API error is retried, with
+                         exponential backoff, before giving up.
+        """
+        super().__init__()
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.poll_interval = poll_interval
+        self.max_retries = max_retries
+        self._buffer: List[Tuple[str, Dict[str, Any], asyncio.Future]] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._batches: "set[asyncio.Task[None]]" = set()
+
+    async def aclose(self) -> None:
+        """Submits any buffered requests, waits for them, and closes the pool."""
+        self._flush()
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        await super().aclose()
+
+    async def _create(self, kwargs: Dict[str, Any]) -> ChatCompletionMessage:
+        """Queues one request for the next batch and waits for its message."""
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append((uuid.uuid4().hex, kwargs, future))
+
+        if len(self._buffer) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(
+                self.flush_interval, self._flush
+            )
+        return await future
+
+    def _flush(self) -> None:
+        """Submits the buffered requests as one batch in the background."""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._buffer:
+            return
+
+        pending, self._buffer = self._buffer, []
+        task = asyncio.ensure_future(self._run_batch(pending))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(
+        self, pending: List[Tuple[str, Dict[str, Any], asyncio.Future]]
+    ) -> None:
+        """Runs one batch to completion and resolves the futures waiting on it."""
+        try:
+            batch_id = await self.submit_batch(
+                [(custom_id, body) for custom_id, body, _ in pending]
+            )
+            messages = await self.wait_for_batch(batch_id)
+        except Exception as exc:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for custom_id, _, future in pending:
+            if future.done():
+                continue
+            # A request that failed inside an otherwise finished batch gets an
+            # empty message, which callers already treat as an unusable reply,
+            # rather than an error that would abort the whole run.
+            future.set_result(
+                messages.get(custom_id)
+                or ChatCompletionMessage(role="assistant", content=None)
+            )
+
+    async def _with_backoff(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Awaits `call()`, retrying transient API errors with exponential backoff."""
+        for attempt in range(self.max_retries):
+            try:
+                return await call()
+            except _TRANSIENT_ERRORS:
+                await asyncio.sleep(2**attempt)
+        return await call()
+
+    async def submit_batch(self, requests: List[Tuple[str, Dict[str, Any]]]) -> str:
+        """
+        Uploads chat completion requests and starts a batch for them.
+
+        Args:
+            requests: `(custom_id, body)` pairs, where each body holds the
+                      keyword arguments of a chat completion request.
+
+        Returns:
+            The ID of the created batch.
+        """
+        lines = (
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": _CHAT_COMPLETIONS_URL,
+                    "body": body,
+                }
+            )
+            for custom_id, body in requests
+        )
+        payload = "\n".join(lines).encode()
+
+        batch_file = await self._with_backoff(
+            lambda: self.client.files.create(
+                file=("batch.jsonl", payload), purpose="batch"
+            )
+        )
+        batch = await self._with_backoff(
+            lambda: self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint=_CHAT_COMPLETIONS_URL,
+                completion_window="24h",
+            )
+        )
+        return batch.id
+
+    async def wait_for_batch(self, batch_id: str) -> Dict[str, ChatCompletionMessage]:
+        """
+        Polls a batch until it finishes and collects its results.
+
+        Args:
+            batch_id: The ID returned by `submit_batch`.
+
+        Raises:
+            RuntimeError: If the batch failed, expired, or was cancelled
+                          without producing any output.
+
+        Returns:
+            A mapping of each successful request's custom_id to its message.
+        """
+        while True:
+            batch = await self._with_backoff(
+                lambda: self.client.batches.retrieve(batch_id)
+            )
+            if batch.status in _FINAL_STATUSES:
+                break
+            await asyncio.sleep(self.poll_interval)
+
+        if not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch_id} finished as '{batch.status}'.")
+
+        content = await self._with_backoff(
+            lambda: self.client.files.content(batch.output_file_id)
+        )
+        messages: Dict[str, ChatCompletionMessage] = {}
+        for line in content.text.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            message = response["body"]["choices"][0]["message"]
+            messages[result["custom_id"]] = ChatCompletionMessage.model_validate(
+                message
+            )
+        return messages
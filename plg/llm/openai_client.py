@@ -1,25 +1,101 @@
-from typing import Any, List, Optional
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
 
+import httpx
 import openai
 from openai.types.chat import ChatCompletionMessage
 
 from plg.config import get_settings
 from plg.llm.base import BaseLLMClient
+from plg.llm.cache import LLMCache, make_cache_key
+from plg.llm.rate_limiter import RateLimiter
+from plg.llm.semantic_cache import EMBEDDING_MODEL, SemanticCache, make_namespace
+
+# Errors worth retrying besides rate limits, which also adjust concurrency.
+# Timeouts subclass APIConnectionError but are never retried, since resending
+# a generation that ran out of time would pay for all of its tokens again.
+_TRANSIENT_ERRORS = (
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+T = TypeVar("T")
+
+# Completion tokens budgeted per request on top of the prompt estimate.
+_COMPLETION_TOKEN_ALLOWANCE = 500
+
+
+# Model families that accept `json_schema` response formats.
+_STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4")
+
+
+def _response_format(model: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Returns the strictest response format the model supports for a schema.
+    Older models only offer JSON mode, which guarantees syntactically valid
+    JSON but not the schema's shape.
+    """
+    if model.startswith(_STRUCTURED_OUTPUT_MODELS) and model != "gpt-4o-2024-05-13":
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "response", "schema": schema, "strict": True},
+        }
+    return {"type": "json_object"}
+
+
+def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Roughly estimates a request's token cost, at ~4 characters per token."""
+    prompt_chars = sum(len(message["content"]) for message in messages)
+    return prompt_chars // 4 + _COMPLETION_TOKEN_ALLOWANCE
 
 
 class OpenAIClient(BaseLLMClient):
     """An LLM client for interacting with OpenAI's API."""
 
     def __init__(self) -> None:
-        """Initializes the OpenAI client using credentials from settings."""
+        """
+        Initializes the OpenAI client using credentials from settings.
+
+        The underlying HTTP client keeps a pool of keep-alive connections, so
+        every request made through this instance reuses warm TLS connections.
+        Chat completions and embeddings go through a rate limiter tuned to the
+        account's limits, and transient failures (connection errors, 429s and 5xx
+        responses) are retried with exponential backoff.
+        """
         settings = get_settings()
         self.client = openai.AsyncOpenAI(
-            api_key=settings.OPENAI_API_KEY.get_secret_value()
+            api_key=settings.OPENAI_API_KEY.get_secret_value(),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+                timeout=httpx.Timeout(600.0, connect=10.0),
+            ),
+            # Retries are handled in `_send`, where they can feed the limiter.
+            max_retries=0,
+        )
+        self.max_retries = 3
+        self.request_timeout = settings.OPENAI_REQUEST_TIMEOUT
+        self.rate_limiter = RateLimiter(
+            requests_per_minute=settings.OPENAI_RPM,
+            tokens_per_minute=settings.OPENAI_TPM,
         )
         self.model_name = settings.MODEL_NAME
+        self.cache = LLMCache()
+        self.semantic_cache_enabled = settings.SEMANTIC_CACHE_ENABLED
+        self.semantic_cache = SemanticCache(threshold=settings.SEMANTIC_CACHE_THRESHOLD)
+
+    async def aclose(self) -> None:
+        """Closes the underlying HTTP connection pool."""
+        await self.client.close()
 
     async def acomplete(
-        self, prompt: str, tools: Optional[List[Any]] = None
+        self,
+        prompt: str,
+        tools: Optional[List[Any]] = None,
+        use_cache: bool = False,
+        system: Optional[str] = None,
+        use_semantic_cache: bool = False,
+        response_schema: Optional[Dict[str, Any]] = None,
+        validate: Optional[Callable[[str], bool]] = None,
+        cache_prompt: Optional[str] = None,
     ) -> ChatCompletionMessage:
         """
         Asynchronously generates a completion for a given prompt using the
@@ -28,18 +104,146 @@ class OpenAIClient(BaseLLMClient):
         Args:
             prompt: The text prompt to send to the model.
             tools: An optional list of tool schemas for function-calling.
+            use_cache: Whether to answer from, and store into, the persistent
+                       response cache. Requests with tools are never cached.
+            system: Optional static instructions, sent as a system message
+                    ahead of the prompt. OpenAI caches long, repeated prefixes
+                    automatically, so this must not vary between calls.
+            use_semantic_cache: Whether a response cached for a similar prompt
+                                may be returned when there is no exact match.
+                                Only enable this for idempotent tagging tasks,
+                                never where varied outputs are wanted. Has no
+                                effect unless SEMANTIC_CACHE_ENABLED is set.
+            response_schema: An optional JSON schema for the response. Models
+                             with structured outputs are held to it strictly;
+                             older models are at least held to valid JSON.
+            validate: An optional check of the response content, typically
+                      that it parses. Only accepted content is cached, and a
+                      cached response it rejects is discarded and requested
+                      again, so one bad reply can't be served from the cache.
+            cache_prompt: The prompt the response is cached under, if it
+                          differs from `prompt`. A retry that appends stricter
+                          instructions uses this, so its accepted reply
+                          answers later requests for the original prompt.
 
         Returns:
             The message object from the OpenAI API response, which contains
             either the text content or tool call information.
         """
-        kwargs: dict[str, Any] = {
-            "model": self.model_name,
-            "messages": [{"role": "user", "content": prompt}],
-        }
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        kwargs: Dict[str, Any] = {"model": self.model_name, "messages": messages}
         if tools:
             kwargs["tools"] = tools
             kwargs["tool_choice"] = "auto"
+        if response_schema:
+            kwargs["response_format"] = _response_format(
+                self.model_name, response_schema
+            )
+
+        cache_key = None
+        namespace = embedding = None
+        if (use_cache or use_semantic_cache) and not tools:
+            # The exact-match lookup is free, so it always goes first.
+            cache_key = make_cache_key(
+                self.model_name,
+                cache_prompt or prompt,
+                system=system,
+                response_schema=response_schema,
+            )
+            cached_json = self.cache.get(cache_key)
+            cached = self._accepted(cached_json, validate)
+            if cached is None and cached_json is not None:
+                # A reply the caller rejects is dropped rather than served again.
+                self.cache.delete(cache_key)
+            if (
+                cached is None
+                and use_semantic_cache
+                and self.semantic_cache_enabled
+                and self.semantic_cache.enabled
+            ):
+                namespace = make_namespace(self.model_name, system)
+                try:
+                    embedding = await self._embed(prompt)
+                except openai.OpenAIError:
+                    # The semantic cache is an optimization; never fail on it.
+                    embedding = None
+                if embedding:
+                    cached = self._accepted(
+                        self.semantic_cache.get(namespace, embedding), validate
+                    )
+            if cached is not None:
+                return cached
+
+        message = await self._create(kwargs)
+        if (
+            cache_key
+            and message.content
+            and (validate is None or validate(message.content))
+        ):
+            response_json = message.model_dump_json()
+            self.cache.set(cache_key, self.model_name, response_json)
+            if namespace and embedding:
+                self.semantic_cache.set(namespace, prompt, embedding, response_json)
+        return message
+
+    @staticmethod
+    def _accepted(
+        response_json: Optional[str], validate: Optional[Callable[[str], bool]]
+    ) -> Optional[ChatCompletionMessage]:
+        """
+        Returns a cached response as a message, or None if there is none or
+        `validate` rejects its content.
+        """
+        if response_json is None:
+            return None
+        message = ChatCompletionMessage.model_validate_json(response_json)
+        if validate is not None and not validate(message.content or ""):
+            return None
+        return message
 
-        response = await self.client.chat.completions.create(**kwargs)
+    async def _embed(self, text: str) -> List[float]:
+        """Returns the embedding of a text for semantic cache lookups."""
+        response = await self._send(
+            lambda: self.client.embeddings.create(
+                model=EMBEDDING_MODEL, input=text, timeout=self.request_timeout
+            ),
+            n_tokens=len(text) // 4,
+        )
+        return response.data[0].embedding
+
+    async def _create(self, kwargs: Dict[str, Any]) -> ChatCompletionMessage:
+        """Sends one chat completion request and returns its message."""
+        response = await self._send(
+            lambda: self.client.chat.completions.create(
+                **kwargs, timeout=self.request_timeout
+            ),
+            n_tokens=_estimate_tokens(kwargs["messages"]),
+        )
         return response.choices[0].message
+
+    async def _send(self, request: Callable[[], Awaitable[T]], n_tokens: int) -> T:
+        """
+        Sends one API request, waiting for rate limiter capacity first and
+        retrying transient errors.
+        """
+        error: Optional[openai.OpenAIError] = None
+        for attempt in range(self.max_retries + 1):
+            if error is not None:
+                await asyncio.sleep(2 ** (attempt - 1))
+            try:
+                async with self.rate_limiter.slot(n_tokens):
+                    response = await request()
+            except openai.APITimeoutError:
+                raise
+            except openai.RateLimitError as exc:
+                self.rate_limiter.record_rate_limited()
+                error = exc
+            except _TRANSIENT_ERRORS as exc:
+                error = exc
+            else:
+                self.rate_limiter.record_success()
+                return response
+        # Every attempt failed with a retryable error; surface the last one.
+        raise error
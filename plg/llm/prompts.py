@@ -1,48 +1,111 @@
-BRANCH_GENERATION_PROMPT = """
+# Prompts are split into a static system prefix and a small dynamic user
+# suffix. The prefixes must be byte-for-byte identical on every call, so the
+# provider's automatic prompt caching can reuse them; anything that varies
+# between calls belongs in the suffix. The prefixes are sent as-is, not
+# formatted, so their braces are literal.
+
+BRANCH_GENERATION_SYSTEM_PREFIX = """
 You are a creative strategist and life coach. Your task is to brainstorm the next set of sequential decision points or outcomes that would follow from a previous choice.
 
-**Initial User Context:**
+You will be given the user's initial context, the decision they have just made, and how many paths to generate.
+
+Generate exactly the requested number of distinct, realistic, and actionable *next steps* or *consequences* that would logically follow. These should represent the next fork in the road after committing to the previous decision. They should not be variations of the parent decision, but what comes *after*.
+
+For example, if the previous decision was 'Go part-time to write a novel,' good next steps could be:
+- 'After six months, you realize your part-time income isn't enough. You could start teaching writing workshops to supplement it.'
+- 'Your writing is gaining traction with short stories. You could apply for an MFA program to further develop your craft.'
+- 'You are struggling with the discipline of writing alone. You could join a writer's group or hire a coach for accountability.'
+
+For each generated path, provide a brief summary and a structured analysis of its tradeoffs.
+
+Return your response as a single JSON object with one key, "branches", holding an array of objects. Each object must have two keys: "decision" (a string) and "tradeoffs" (a list of strings).
+Each tradeoff string must start with either "+" (for a positive tradeoff) or "-" (for a negative tradeoff).
+
+Example format:
+{
+    "branches": [
+        {
+            "decision": "First possible path...",
+            "tradeoffs": [
+                "+ More creative freedom",
+                "- Less stable income"
+            ]
+        },
+        {
+            "decision": "Second possible path...",
+            "tradeoffs": [
+                "+ Better work-life balance",
+                "- Slower career progression"
+            ]
+        }
+    ]
+}
+"""
+
+# Shared by the plain and the annotated branch generation prompts.
+BRANCH_GENERATION_USER_SUFFIX = """**Initial User Context:**
 {context_text}
 
 **The user has just made the following decision:**
 {parent_summary}
 
-Now, generate exactly {max_children} distinct, realistic, and actionable *next steps* or *consequences* that would logically follow. These should represent the next fork in the road after committing to the previous decision. They should not be variations of the parent decision, but what comes *after*.
+Generate exactly {max_children} next steps."""
+
+ANNOTATED_BRANCH_GENERATION_SYSTEM_PREFIX = """
+You are a creative strategist, life coach, and strategic analyst. Your task is to brainstorm the next set of sequential decision points or outcomes that would follow from a previous choice, and to tag each of them for risk, growth potential, and emotional tone.
+
+You will be given the user's initial context, the decision they have just made, and how many paths to generate.
+
+Generate exactly the requested number of distinct, realistic, and actionable *next steps* or *consequences* that would logically follow. These should represent the next fork in the road after committing to the previous decision. They should not be variations of the parent decision, but what comes *after*.
 
 For example, if the previous decision was 'Go part-time to write a novel,' good next steps could be:
 - 'After six months, you realize your part-time income isn't enough. You could start teaching writing workshops to supplement it.'
 - 'Your writing is gaining traction with short stories. You could apply for an MFA program to further develop your craft.'
 - 'You are struggling with the discipline of writing alone. You could join a writer's group or hire a coach for accountability.'
 
-For each generated path, provide a brief summary and a structured analysis of its tradeoffs.
+For each generated path, provide a brief summary, a structured analysis of its tradeoffs, and its tags.
+
+**Tagging instructions:**
+1.  **Risk**: Assess the level of financial, social, or personal risk. Consider non-obvious risks. Rate it as "Low", "Medium", "High", or "Very High".
+2.  **Growth Potential**: Assess the potential for personal or professional growth. Consider hidden opportunities. Rate it as "Low", "Medium", "High", or "Transformative".
+3.  **Emotional Tone**: Describe the primary emotional tone of this path. Be realistic and nuanced. Use a single descriptive word. Examples: "Hopeful", "Anxious", "Torn", "Regretful", "Energized", "Pragmatic", "Adventurous", "Cautious".
 
-Return your response as a single, flat JSON array of objects. Each object must have two keys: "decision" (a string) and "tradeoffs" (a list of strings).
+Return your response as a single JSON object with one key, "branches", holding an array of objects. Each object must have three keys: "decision" (a string), "tradeoffs" (a list of strings), and "tags" (an object with the keys "risk", "growth", and "emotion").
 Each tradeoff string must start with either "+" (for a positive tradeoff) or "-" (for a negative tradeoff).
 
 Example format:
-[
-    {{
-        "decision": "First possible path...",
-        "tradeoffs": [
-            "+ More creative freedom",
-            "- Less stable income"
-        ]
-    }},
-    {{
-        "decision": "Second possible path...",
-        "tradeoffs": [
-            "+ Better work-life balance",
-            "- Slower career progression"
-        ]
-    }}
-]
+{
+    "branches": [
+        {
+            "decision": "First possible path...",
+            "tradeoffs": [
+                "+ More creative freedom",
+                "- Less stable income"
+            ],
+            "tags": {
+                "risk": "High",
+                "growth": "Transformative",
+                "emotion": "Adventurous"
+            }
+        },
+        {
+            "decision": "Second possible path...",
+            "tradeoffs": [
+                "+ Better work-life balance",
+                "- Slower career progression"
+            ],
+            "tags": {
+                "risk": "Low",
+                "growth": "Medium",
+                "emotion": "Pragmatic"
+            }
+        }
+    ]
+}
 """
 
-TAG_GENERATION_PROMPT = """
-You are a strategic analyst and psychologist. Your task is to analyze the following proposed life path or decision and assign it tags for risk, growth potential, and emotional tone.
-
-**Decision to Analyze:**
-"{summary}"
+TAG_GENERATION_SYSTEM_PREFIX = """
+You are a strategic analyst and psychologist. Your task is to analyze a proposed life path or decision and assign it tags for risk, growth potential, and emotional tone.
 
 **Instructions:**
 1.  **Risk**: Assess the level of financial, social, or personal risk. Consider non-obvious risks. Rate it as "Low", "Medium", "High", or "Very High".
@@ -52,13 +115,15 @@ You are a strategic analyst and psychologist. Your task is to analyze the follow
 Return your analysis as a single, flat JSON object. Do not include any other text, explanation, or markdown formatting.
 
 Example format:
-{{
+{
   "risk": "Medium",
   "growth": "High",
   "emotion": "Ambitious"
-}}
+}
 """
 
+TAG_GENERATION_USER_SUFFIX = '**Decision to Analyze:**\n"{summary}"'
+
 CONTEXT_SUMMARY_PROMPT = """
 Please synthesize the following points into a concise summary of the user's situation.
 Focus on the key elements and desired outcome.
@@ -68,3 +133,101 @@ Context points:
 
 Summary:
 """
+
+# Appended to the user prompt when retrying a request whose response could
+# not be parsed. It goes after the dynamic suffix to leave the prefix intact.
+STRICT_JSON_SUFFIX = "\n\nRespond with ONLY valid JSON, no markdown."
+
+BULK_TAG_GENERATION_SYSTEM_PREFIX = """
+You are a strategic analyst and psychologist. Your task is to analyze each of a numbered list of proposed life paths or decisions and assign it tags for risk, growth potential, and emotional tone.
+
+**Instructions (apply to each decision independently):**
+1.  **Risk**: Assess the level of financial, social, or personal risk. Consider non-obvious risks. Rate it as "Low", "Medium", "High", or "Very High".
+2.  **Growth Potential**: Assess the potential for personal or professional growth. Consider hidden opportunities. Rate it as "Low", "Medium", "High", or "Transformative".
+3.  **Emotional Tone**: Describe the primary emotional tone of this path. Be realistic and nuanced. Use a single descriptive word. Examples: "Hopeful", "Anxious", "Torn", "Regretful", "Energized", "Pragmatic", "Adventurous", "Cautious".
+
+Return your analysis as a single JSON object with one key, "annotations", holding an array with exactly one object per decision, in the same order as the decisions. Do not include any other text, explanation, or markdown formatting.
+
+Example format:
+{
+  "annotations": [
+    {
+      "risk": "Medium",
+      "growth": "High",
+      "emotion": "Ambitious"
+    },
+    {
+      "risk": "Low",
+      "growth": "Medium",
+      "emotion": "Pragmatic"
+    }
+  ]
+}
+"""
+
+BULK_TAG_GENERATION_USER_SUFFIX = """**Decisions to Analyze ({count} in total):**
+{summaries}"""
+
+# JSON schemas for structured outputs. Strict mode requires every property
+# to be listed as required and no additional properties to be allowed.
+TAG_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "risk": {"type": "string", "enum": ["Low", "Medium", "High", "Very High"]},
+        "growth": {
+            "type": "string",
+            "enum": ["Low", "Medium", "High", "Transformative"],
+        },
+        "emotion": {"type": "string"},
+    },
+    "required": ["risk", "growth", "emotion"],
+    "additionalProperties": False,
+}
+
+BULK_TAG_SCHEMA = {
+    "type": "object",
+    "properties": {"annotations": {"type": "array", "items": TAG_SCHEMA}},
+    "required": ["annotations"],
+    "additionalProperties": False,
+}
+
+BRANCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "branches": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "decision": {"type": "string"},
+                    "tradeoffs": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["decision", "tradeoffs"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["branches"],
+    "additionalProperties": False,
+}
+
+ANNOTATED_BRANCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "branches": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "decision": {"type": "string"},
+                    "tradeoffs": {"type": "array", "items": {"type": "string"}},
+                    "tags": TAG_SCHEMA,
+                },
+                "required": ["decision", "tradeoffs", "tags"],
+                "additionalProperties": False,
+            },
+        }
+    },
+    "required": ["branches"],
+    "additionalProperties": False,
+}
@@ -0,0 +1,104 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+
+class _TokenBucket:
+    """A bucket refilled continuously up to a per-minute capacity."""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float]) -> None:
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Returns the seconds until `amount` is available, 0 if it already is."""
+        self._refill()
+        # A request larger than the whole bucket only waits for a full bucket.
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Keeps requests within an account's request and token rate limits, and
+    adapts how many requests may be in flight at once.
+
+    Requests draw from two token buckets, one in requests and one in tokens
+    per minute, and wait until both can cover them. Concurrency follows
+    AIMD: every rate-limit error cuts the in-flight cap by 20%, and every
+    run of successful requests as long as the cap raises it by one, so the
+    client settles just below the rate the account actually allows.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int = 32,
+        min_concurrency: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._requests = _TokenBucket(requests_per_minute, clock)
+        self._tokens = _TokenBucket(tokens_per_minute, clock)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.concurrency = float(max_concurrency)
+        self._in_flight = 0
+        self._successes = 0
+        self._slot_freed = asyncio.Condition()
+        self._bucket_lock = asyncio.Lock()
+
+    async def acquire(self, n_tokens: int) -> None:
+        """Waits until both buckets can cover a request of ~`n_tokens` tokens."""
+        # Requests are admitted one at a time, in order, so a large request
+        # isn't starved by a stream of small ones.
+        async with self._bucket_lock:
+            while True:
+                delay = max(
+                    self._requests.wait_time(1), self._tokens.wait_time(n_tokens)
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+            self._requests.take(1)
+            self._tokens.take(n_tokens)
+
+    @asynccontextmanager
+    async def slot(self, n_tokens: int) -> AsyncIterator[None]:
+        """Holds one in-flight slot for a request of ~`n_tokens` tokens."""
+        async with self._slot_freed:
+            await self._slot_freed.wait_for(
+                lambda: self._in_flight < int(self.concurrency)
+            )
+            self._in_flight += 1
+        try:
+            await self.acquire(n_tokens)
+            yield
+        finally:
+            async with self._slot_freed:
+                self._in_flight -= 1
+                self._slot_freed.notify_all()
+
+    def record_success(self) -> None:
+        """Additive increase: one more slot after a full run of successes."""
+        self._successes += 1
+        if self._successes >= int(self.concurrency):
+            self._successes = 0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+
+    def record_rate_limited(self) -> None:
+        """Multiplicative decrease: drop the in-flight cap by 20%."""
+        self._successes = 0
+        self.concurrency = max(self.min_concurrency, self.concurrency * 0.8)
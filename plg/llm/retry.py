@@ -0,0 +1,43 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class InvalidResponseError(Exception):
+    """Raised when an LLM response can't be used, so the request is retried."""
+
+
+async def with_retry(
+    coro_factory: Callable[[int], Awaitable[T]],
+    attempts: int = 3,
+    base: float = 0.5,
+    retry_on: Tuple[Type[BaseException], ...] = (InvalidResponseError,),
+) -> T:
+    """
+    Awaits a fresh coroutine from `coro_factory` until one succeeds, sleeping
+    with jittered exponential backoff between attempts.
+
+    Args:
+        coro_factory: Called with the zero-based attempt number, so later
+                      attempts can adjust the request, e.g. with a stricter
+                      prompt.
+        attempts: The maximum number of attempts.
+        base: The delay in seconds before the second attempt; it doubles for
+              every attempt after that.
+        retry_on: The exception types that trigger another attempt. Anything
+                  else propagates immediately.
+
+    Raises:
+        The exception of the last attempt, if every attempt failed.
+
+    Returns:
+        The result of the first successful attempt.
+    """
+    for attempt in range(attempts - 1):
+        try:
+            return await coro_factory(attempt)
+        except retry_on:
+            await asyncio.sleep(base * 2**attempt + random.random() * 0.1)
+    return await coro_factory(attempts - 1)
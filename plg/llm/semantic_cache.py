@@ -0,0 +1,105 @@
+import hashlib
+import json
+import math
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from plg.models import db
+from plg.models.models import LLMEmbeddingEntry
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+DEFAULT_THRESHOLD = 0.92
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    """Scales a vector to unit length, so cosine similarity is a dot product."""
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+def make_namespace(model: str, system: Optional[str] = None) -> str:
+    """Returns the key grouping cache entries that may answer each other."""
+    return hashlib.sha256(f"{model}\0{system or ''}".encode()).hexdigest()
+
+
+class SemanticCache:
+    """
+    A persistent cache of LLM responses looked up by meaning rather than by
+    exact text. A prompt is answered from the cache when its embedding's
+    cosine similarity to a stored prompt reaches `threshold`.
+
+    Entries are stored in the application's SQLite database and compared in
+    memory; a namespace's vectors are read once and then kept up to date.
+    Only use this for requests where a paraphrase deserves the same answer.
+    """
+
+    def __init__(
+        self, engine: Optional[Engine] = None, threshold: float = DEFAULT_THRESHOLD
+    ) -> None:
+        self.engine = engine or db.engine
+        self.threshold = threshold
+        self._table_ready = False
+        self._vectors: Dict[str, List[Tuple[List[float], str]]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any lookup could hit; a threshold above 1 disables the cache."""
+        return self.threshold <= 1.0
+
+    def _ensure_table(self) -> None:
+        """Creates the embeddings table on first use, including in existing databases."""
+        if not self._table_ready:
+            LLMEmbeddingEntry.__table__.create(self.engine, checkfirst=True)  # type: ignore[attr-defined]
+            self._table_ready = True
+
+    def _load(self, namespace: str) -> List[Tuple[List[float], str]]:
+        """Returns the `(embedding, response_json)` pairs stored for a namespace."""
+        vectors = self._vectors.get(namespace)
+        if vectors is None:
+            self._ensure_table()
+            with Session(self.engine) as session:
+                entries = session.exec(
+                    select(LLMEmbeddingEntry).where(
+                        LLMEmbeddingEntry.namespace == namespace
+                    )
+                ).all()
+            vectors = [
+                (json.loads(entry.embedding_json), entry.response_json)
+                for entry in entries
+            ]
+            self._vectors[namespace] = vectors
+        return vectors
+
+    def get(self, namespace: str, embedding: List[float]) -> Optional[str]:
+        """
+        Returns the response JSON of the most similar stored prompt, or None
+        if no stored prompt reaches the similarity threshold.
+        """
+        query = _normalize(embedding)
+        best_score, best_response = self.threshold, None
+        for vector, response_json in self._load(namespace):
+            score = sum(a * b for a, b in zip(query, vector))
+            if score >= best_score:
+                best_score, best_response = score, response_json
+        return best_response
+
+    def set(
+        self, namespace: str, prompt: str, embedding: List[float], response_json: str
+    ) -> None:
+        """Stores a response under the embedding of its prompt."""
+        vector = _normalize(embedding)
+        # Load the namespace first, so the new entry isn't read back twice.
+        vectors = self._load(namespace)
+        with Session(self.engine) as session:
+            session.add(
+                LLMEmbeddingEntry(
+                    namespace=namespace,
+                    prompt=prompt,
+                    embedding_json=json.dumps(vector),
+                    response_json=response_json,
+                )
+            )
+            session.commit()
+        vectors.append((vector, response_json))
@@ -2,6 +2,9 @@ from contextlib import contextmanager
 from pathlib import Path
 from typing import Optional
 
+from sqlalchemy import event
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.pool import QueuePool
 from sqlmodel import Session, SQLModel, create_engine
 
 # Import models to make them available to the engine
@@ -12,7 +15,44 @@ DB_DIR = Path.home() / ".plg"
 DB_PATH = DB_DIR / "plg.db"
 CONN_STR = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(CONN_STR)
+# Applied to every new SQLite connection. WAL lets readers proceed while a
+# write is in progress and avoids syncing a rollback journal on every commit.
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+)
+
+# A pooled engine lets repeated sessions within one CLI invocation reuse
+# warm connections instead of reconnecting to SQLite each time. Pooled
+# connections may be handed to other threads, and writers wait up to 30
+# seconds for a lock instead of failing immediately.
+engine = create_engine(
+    CONN_STR,
+    poolclass=QueuePool,
+    pool_pre_ping=True,
+    pool_size=5,
+    max_overflow=10,
+    pool_recycle=3600,
+    connect_args={"check_same_thread": False, "timeout": 30},
+)
+
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """Applies the SQLite PRAGMAs to each new connection in the pool."""
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in _SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+# Set once the database is known to exist, so later sessions skip the check.
+_initialized = False
 
 
 def _create_db_and_tables():
@@ -22,24 +62,48 @@ def _create_db_and_tables():
     SQLModel.metadata.create_all(engine)
 
 
+def _upgrade_schema():
+    """
+    Creates any table or index declared on the models that an existing
+    database lacks. `create_all` skips tables that already exist, including
+    their indexes, so indexes added to the models later are created here.
+    """
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                # IF NOT EXISTS rather than checkfirst, since SQLAlchemy can't
+                # reflect expression indexes on SQLite to check for them.
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+
 def init_database_if_needed():
     """
     Initializes the database and tables if the database file does not
-    already exist.
+    already exist, and brings the schema of an existing database up to
+    date. This only runs once per process.
     """
-    if not DB_PATH.exists():
+    global _initialized
+    if _initialized:
+        return
+    if DB_PATH.exists():
+        _upgrade_schema()
+    else:
         _create_db_and_tables()
+    _initialized = True
 
 
 @contextmanager
 def get_session(db_engine: Optional[create_engine] = None):
     """Provides a transactional scope around a series of operations."""
     # This ensures that no matter where get_session is called from,
-    # the database is ready.
+    # the database is ready. After the first call this is a flag check.
     init_database_if_needed()
 
     current_engine = db_engine or engine
-    session = Session(current_engine)
+    # Objects stay loaded after a commit, so callers can keep using the rows
+    # they just wrote without a SELECT per object to reload them.
+    session = Session(current_engine, expire_on_commit=False)
     try:
         yield session
         session.commit()
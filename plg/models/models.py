@@ -1,6 +1,7 @@
 import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
+from sqlalchemy import JSON, Column, Index, func
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -9,7 +10,9 @@ class ContextBlock(SQLModel, table=True):
     text: str
     role: str  # E.g., 'system', 'user', 'assistant'
 
-    decision_id: Optional[int] = Field(default=None, foreign_key="decision.id")
+    decision_id: Optional[int] = Field(
+        default=None, foreign_key="decision.id", index=True
+    )
     decision: Optional["Decision"] = Relationship(back_populates="context_blocks")
 
 
@@ -17,8 +20,10 @@ class Decision(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     text: str
     summary: Optional[str] = Field(default=None)
-    tags: Optional[str] = Field(default=None)  # JSON string for tags
-    tradeoffs: Optional[str] = Field(default=None)  # JSON string for tradeoffs
+    # Stored as SQLite JSON, so rows load as Python objects and tags can be
+    # queried with json_extract.
+    tags: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))
+    tradeoffs: Optional[List[str]] = Field(default=None, sa_column=Column(JSON))
     created_at: datetime.datetime = Field(
         default_factory=datetime.datetime.utcnow, nullable=False
     )
@@ -27,17 +32,50 @@ class Decision(SQLModel, table=True):
     branch_nodes: List["BranchNode"] = Relationship(back_populates="decision")
 
 
+# Lets filters on a decision's risk tag use an index instead of parsing the
+# tags of every row.
+Index("ix_decision_risk", func.json_extract(Decision.__table__.c.tags, "$.risk"))
+
+
 class BranchNode(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
 
     # Foreign Key to the Decision that this node represents
-    decision_id: Optional[int] = Field(default=None, foreign_key="decision.id")
+    decision_id: Optional[int] = Field(
+        default=None, foreign_key="decision.id", index=True
+    )
     decision: Optional["Decision"] = Relationship(back_populates="branch_nodes")
 
     # Self-referential relationship to build the tree
-    parent_id: Optional[int] = Field(default=None, foreign_key="branchnode.id")
+    parent_id: Optional[int] = Field(
+        default=None, foreign_key="branchnode.id", index=True
+    )
     parent: Optional["BranchNode"] = Relationship(
         back_populates="children",
         sa_relationship_kwargs=dict(remote_side="BranchNode.id"),
     )
     children: List["BranchNode"] = Relationship(back_populates="parent")
+
+
+class LLMCacheEntry(SQLModel, table=True):
+    # SHA-256 of the model name, prompt, and tools of the cached request.
+    key: str = Field(primary_key=True)
+    model: str
+    response_json: str  # JSON-serialized response message
+    created_at: datetime.datetime = Field(
+        default_factory=datetime.datetime.utcnow, nullable=False
+    )
+    ttl_seconds: int
+
+
+class LLMEmbeddingEntry(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # SHA-256 of the model name and system prompt; only entries in the same
+    # namespace are compared.
+    namespace: str = Field(index=True)
+    prompt: str
+    embedding_json: str  # JSON-serialized, unit-length embedding vector
+    response_json: str  # JSON-serialized response message
+    created_at: datetime.datetime = Field(
+        default_factory=datetime.datetime.utcnow, nullable=False
+    )
@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import contains_eager
+from sqlmodel import Session, func, select
+
+from plg.models.models import BranchNode, Decision
+
+
+@dataclass
+class Subtree:
+    """An in-memory snapshot of a BranchNode and all of its descendants."""
+
+    root: BranchNode
+    nodes: Dict[int, BranchNode] = field(default_factory=dict)
+    children_by_parent: Dict[int, List[BranchNode]] = field(default_factory=dict)
+
+    def children(self, node: BranchNode) -> List[BranchNode]:
+        """Returns the children of a node without touching the database."""
+        return self.children_by_parent.get(node.id, [])
+
+
+def _subtree_ids(start_node_id: int):
+    """Builds a recursive CTE selecting the IDs of a node and its descendants."""
+    subtree_ids = (
+        select(BranchNode.id)
+        .where(BranchNode.id == start_node_id)
+        .cte("subtree", recursive=True)
+    )
+    return subtree_ids.union_all(
+        select(BranchNode.id).where(BranchNode.parent_id == subtree_ids.c.id)
+    )
+
+
+def load_subtree(session: Session, start_node_id: int) -> Optional[Subtree]:
+    """
+    Loads a BranchNode, all of its descendants, and their Decisions with a
+    single recursive CTE query.
+
+    Each node's `decision` is populated from the same query, so accessing it
+    afterwards does not emit further queries. Children must be
+    read through `Subtree.children` rather than the lazy `node.children`.
+
+    Args:
+        session: The active database session.
+        start_node_id: The ID of the BranchNode at the root of the subtree.
+
+    Returns:
+        The loaded Subtree, or None if the start node does not exist.
+    """
+    subtree_ids = _subtree_ids(start_node_id)
+
+    rows = session.exec(
+        select(BranchNode)
+        .outerjoin(Decision, BranchNode.decision_id == Decision.id)
+        .where(BranchNode.id.in_(select(subtree_ids.c.id)))
+        .options(contains_eager(BranchNode.decision))
+        .order_by(BranchNode.id)
+    ).all()
+
+    nodes = {node.id: node for node in rows}
+    root = nodes.get(start_node_id)
+    if root is None:
+        return None
+
+    subtree = Subtree(root=root, nodes=nodes)
+    for node in nodes.values():
+        if node.id != start_node_id and node.parent_id is not None:
+            subtree.children_by_parent.setdefault(node.parent_id, []).append(node)
+    return subtree
+
+
+def count_subtree(session: Session, start_node_id: int) -> int:
+    """
+    Counts a BranchNode and all of its descendants with a single query,
+    without loading them.
+
+    Args:
+        session: The active database session.
+        start_node_id: The ID of the BranchNode at the root of the subtree.
+
+    Returns:
+        The number of nodes in the subtree, or 0 if the node does not exist.
+    """
+    subtree_ids = _subtree_ids(start_node_id)
+    return session.exec(select(func.count()).select_from(subtree_ids)).one()
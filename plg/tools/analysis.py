@@ -1,14 +1,131 @@
+import asyncio
+import hashlib
 import json
-from typing import Dict, Any
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional
 
 from plg.llm.factory import get_llm_client
-from plg.llm.prompts import TAG_GENERATION_PROMPT
+from plg.llm.prompts import (
+    BULK_TAG_GENERATION_SYSTEM_PREFIX,
+    BULK_TAG_GENERATION_USER_SUFFIX,
+    BULK_TAG_SCHEMA,
+    STRICT_JSON_SUFFIX,
+    TAG_GENERATION_SYSTEM_PREFIX,
+    TAG_GENERATION_USER_SUFFIX,
+    TAG_SCHEMA,
+)
+from plg.llm.retry import InvalidResponseError, with_retry
+from plg.models.models import Decision
+
+# Maximum number of annotations kept in the in-process LRU memo.
+_ANNOTATION_CACHE_SIZE = 1024
+# The most summaries sent to the LLM in a single bulk annotation request.
+_BULK_CHUNK_SIZE = 20
+
+# In-process LRU memo of annotations, keyed by a content hash of the text.
+_annotation_cache: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+
+# Annotation requests currently awaiting the LLM, keyed like the memo, so
+# concurrent callers with the same text share a single request.
+_inflight: "Dict[bytes, asyncio.Task[Dict[str, Any]]]" = {}
+
+
+def _text_key(text: str) -> bytes:
+    """Returns a compact content hash used as the annotation cache key."""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _cache_get(key: bytes) -> Optional[Dict[str, Any]]:
+    """Returns a memoized annotation, marking it as recently used."""
+    annotations = _annotation_cache.get(key)
+    if annotations is not None:
+        _annotation_cache.move_to_end(key)
+    return annotations
+
+
+def _cache_put(key: bytes, annotations: Dict[str, Any]) -> None:
+    """Memoizes an annotation, evicting the least recently used entry."""
+    _annotation_cache[key] = annotations
+    _annotation_cache.move_to_end(key)
+    if len(_annotation_cache) > _ANNOTATION_CACHE_SIZE:
+        _annotation_cache.popitem(last=False)
+
+
+def _parse_tags(content: Optional[str]) -> Dict[str, Any]:
+    """Parses a single tag response, raising if it can't be used."""
+    if not content:
+        raise InvalidResponseError("Empty tag response.")
+    try:
+        annotations = json.loads(content)
+    except json.JSONDecodeError as exc:
+        raise InvalidResponseError("Tag response is not valid JSON.") from exc
+    if not isinstance(annotations, dict):
+        raise InvalidResponseError("Tag response is not a JSON object.")
+    return annotations
+
+
+def _accepts(parse: Callable[[str], Any]) -> Callable[[str], bool]:
+    """
+    Turns a response parser into the `validate` check of `acomplete`, so
+    only responses that parse are cached.
+    """
+
+    def validate(content: str) -> bool:
+        try:
+            parse(content)
+        except InvalidResponseError:
+            return False
+        return True
+
+    return validate
+
+
+async def _request_annotation(
+    key: bytes, summary: str, use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    Asks the LLM to annotate a single summary and memoizes the result. Tagging
+    is idempotent, so unless `use_cache` is False the client may answer from
+    its persistent response cache. Unusable responses are retried with a
+    stricter prompt before giving up with an empty result.
+    """
+    llm_client = get_llm_client()
+
+    prompt = TAG_GENERATION_USER_SUFFIX.format(summary=summary)
+
+    async def _attempt(attempt: int) -> Dict[str, Any]:
+        # Retries ask for strict JSON. A rejected reply is never cached, and
+        # an accepted retry reply is cached under the original prompt, so
+        # later runs find it without retrying.
+        # Paraphrased decisions deserve the same tags, so a semantically
+        # similar cached answer is good enough for the first attempt. Bulk
+        # prompts mix several decisions and only use the exact-match cache.
+        response = await llm_client.acomplete(
+            prompt=prompt if attempt == 0 else prompt + STRICT_JSON_SUFFIX,
+            system=TAG_GENERATION_SYSTEM_PREFIX,
+            use_cache=use_cache,
+            use_semantic_cache=use_cache and attempt == 0,
+            response_schema=TAG_SCHEMA,
+            validate=_accepts(_parse_tags),
+            cache_prompt=prompt,
+        )
+        return _parse_tags(response.content if response else None)
+
+    try:
+        annotations = await with_retry(_attempt)
+    except InvalidResponseError:
+        return {}
+
+    _cache_put(key, annotations)
+    return annotations
 
 
 async def annotate_branch(summary: str) -> Dict[str, Any]:
     """
     Analyzes a branch summary using an LLM to assess its risk, growth
-    potential, and emotional tone.
+    potential, and emotional tone. Results are memoized per process, and
+    concurrent calls for the same text share one in-flight request, so
+    identical texts only cost one LLM call.
 
     Args:
         summary: The text of the branch decision to analyze.
@@ -16,18 +133,213 @@ async def annotate_branch(summary: str) -> Dict[str, Any]:
     Returns:
         A dictionary containing the analysis tags.
     """
+    key = _text_key(summary)
+    cached = _cache_get(key)
+    if cached is not None:
+        return cached
+
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_request_annotation(key, summary))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    # Shield the shared request so one cancelled caller doesn't cancel it
+    # for everyone else awaiting the same text.
+    return await asyncio.shield(task)
+
+
+def _parse_bulk_tags(content: Optional[str], count: int) -> List[Dict[str, Any]]:
+    """
+    Parses a bulk tag response holding `count` tag objects, raising if it
+    can't be used.
+    """
+    if not content:
+        raise InvalidResponseError("Empty bulk tag response.")
+    try:
+        result = json.loads(content)
+    except json.JSONDecodeError as exc:
+        raise InvalidResponseError("Bulk tag response is not valid JSON.") from exc
+    if not isinstance(result, dict):
+        raise InvalidResponseError("Bulk tag response is not a JSON object.")
+    annotations = result.get("annotations")
+    if not (
+        isinstance(annotations, list)
+        and len(annotations) == count
+        and all(isinstance(a, dict) for a in annotations)
+    ):
+        raise InvalidResponseError(f"Bulk tag response does not hold {count} tags.")
+    return annotations
+
+
+async def _request_bulk_annotation(
+    summaries: List[str], use_cache: bool
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Asks the LLM to annotate a chunk of summaries in one call and memoizes
+    the results. An unusable response is retried once with a stricter prompt;
+    returns None if that fails too.
+    """
     llm_client = get_llm_client()
 
-    prompt = TAG_GENERATION_PROMPT.format(summary=summary)
+    numbered = "\n".join(
+        f'{i}. "{summary}"' for i, summary in enumerate(summaries, start=1)
+    )
+    prompt = BULK_TAG_GENERATION_USER_SUFFIX.format(
+        summaries=numbered, count=len(summaries)
+    )
 
-    response = await llm_client.acomplete(prompt=prompt)
-    if not (response and response.content):
-        return {}
+    def parse(content: Optional[str]) -> List[Dict[str, Any]]:
+        return _parse_bulk_tags(content, len(summaries))
+
+    async def _attempt(attempt: int) -> List[Dict[str, Any]]:
+        # As with single tags, only accepted replies are cached, and a retry's
+        # reply is cached under the original prompt.
+        response = await llm_client.acomplete(
+            prompt=prompt if attempt == 0 else prompt + STRICT_JSON_SUFFIX,
+            system=BULK_TAG_GENERATION_SYSTEM_PREFIX,
+            use_cache=use_cache,
+            response_schema=BULK_TAG_SCHEMA,
+            validate=_accepts(parse),
+            cache_prompt=prompt,
+        )
+        return parse(response.content if response else None)
 
     try:
-        annotations = json.loads(response.content)
-        if isinstance(annotations, dict):
-            return annotations
-        return {}
-    except json.JSONDecodeError:
-        return {}
+        annotations = await with_retry(_attempt, attempts=2)
+    except InvalidResponseError:
+        return None
+
+    for summary, annotation in zip(summaries, annotations):
+        _cache_put(_text_key(summary), annotation)
+    return annotations
+
+
+async def annotate_branches_bulk(
+    summaries: List[str], use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Analyzes several branch summaries with as few LLM calls as possible.
+    Summaries already in the in-process memo are not sent again, and the rest
+    are sent in chunks of `_BULK_CHUNK_SIZE`, concurrently, so a single
+    response never has to hold more answers than the model reliably returns.
+
+    Args:
+        summaries: The texts of the branch decisions to analyze.
+        use_cache: If False, every summary is sent, ignoring both the memo and
+                   the client's persistent response cache.
+
+    Returns:
+        A list with one dictionary of analysis tags per summary, in the same
+        order, or an empty list if any LLM response could not be used.
+        Chunks that did succeed stay memoized for the caller's fallback.
+    """
+    found: Dict[str, Dict[str, Any]] = {}
+    missing: List[str] = []
+    for summary in dict.fromkeys(summaries):
+        cached = _cache_get(_text_key(summary)) if use_cache else None
+        if cached is not None:
+            found[summary] = cached
+        else:
+            missing.append(summary)
+
+    chunks = [
+        missing[i : i + _BULK_CHUNK_SIZE]
+        for i in range(0, len(missing), _BULK_CHUNK_SIZE)
+    ]
+    results = await asyncio.gather(
+        *[_request_bulk_annotation(chunk, use_cache) for chunk in chunks]
+    )
+    for chunk, annotations in zip(chunks, results):
+        if annotations is None:
+            return []
+        found.update(zip(chunk, annotations))
+
+    return [found[summary] for summary in summaries]
+
+
+def _load_tags(decision: Decision) -> Optional[Dict[str, Any]]:
+    """Returns the non-empty tags persisted on a decision, if any."""
+    tags = decision.tags
+    if isinstance(tags, dict) and tags:
+        return tags
+    return None
+
+
+async def annotate_decision(decision: Decision) -> Dict[str, Any]:
+    """
+    Returns the annotations for a decision, reusing the tags persisted on the
+    row when available. On a miss, the decision text is annotated and the
+    result is written back to `decision.tags`.
+
+    Args:
+        decision: The Decision to annotate. It must be attached to a session
+                  for the write-back to be persisted.
+
+    Returns:
+        A dictionary containing the analysis tags.
+    """
+    tags = _load_tags(decision)
+    if tags is not None:
+        return tags
+
+    annotations = await annotate_branch(decision.text)
+    if annotations:
+        decision.tags = annotations
+    return annotations
+
+
+async def annotate_decisions(
+    decisions: List[Decision],
+    max_workers: int = 8,
+    force_reannotate: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Returns the annotations for several decisions at once. Persisted tags are
+    reused, and all remaining texts are annotated with bulk LLM calls. If a
+    bulk response is unusable, this falls back to concurrent
+    per-decision calls. New annotations are written back to `decision.tags`.
+
+    Args:
+        decisions: The Decisions to annotate.
+        max_workers: The maximum number of concurrent calls in the fallback.
+        force_reannotate: If True, persisted tags and memoized annotations
+                          are ignored and every decision is sent to the LLM.
+
+    Returns:
+        A list with one dictionary of analysis tags per decision, in order.
+    """
+    results: List[Dict[str, Any]] = [{} for _ in decisions]
+    pending: Dict[str, List[int]] = {}
+    for i, decision in enumerate(decisions):
+        tags = None if force_reannotate else _load_tags(decision)
+        if tags is not None:
+            results[i] = tags
+        else:
+            pending.setdefault(decision.text, []).append(i)
+
+    if not pending:
+        return results
+
+    texts = list(pending)
+    annotations = await annotate_branches_bulk(texts, use_cache=not force_reannotate)
+    if not annotations:
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _annotate(text: str) -> Dict[str, Any]:
+            async with semaphore:
+                if force_reannotate:
+                    return await _request_annotation(
+                        _text_key(text), text, use_cache=False
+                    )
+                return await annotate_branch(text)
+
+        annotations = await asyncio.gather(*[_annotate(text) for text in texts])
+
+    for text, annotation in zip(texts, annotations):
+        for i in pending[text]:
+            results[i] = annotation
+            if annotation:
+                decisions[i].tags = annotation
+
+    return results
@@ -1,10 +1,18 @@
 import json
-from typing import List, TypedDict
+from typing import Any, Dict, List, TypedDict
 
 from plg.llm.factory import get_llm_client
-from plg.llm.prompts import BRANCH_GENERATION_PROMPT
+from plg.llm.prompts import (
+    ANNOTATED_BRANCH_GENERATION_SYSTEM_PREFIX,
+    ANNOTATED_BRANCH_SCHEMA,
+    BRANCH_GENERATION_SYSTEM_PREFIX,
+    BRANCH_GENERATION_USER_SUFFIX,
+    BRANCH_SCHEMA,
+    STRICT_JSON_SUFFIX,
+)
+from plg.llm.retry import InvalidResponseError, with_retry
 from plg.models.models import ContextBlock
-from plg.tools.parsing import extract_json_from_markdown
+from plg.tools.context import format_context
 
 
 class Branch(TypedDict):
@@ -12,6 +20,50 @@ class Branch(TypedDict):
     tradeoffs: List[str]
 
 
+class AnnotatedBranch(Branch):
+    tags: Dict[str, Any]
+
+
+async def _request_branches(
+    prompt: str, system: str, response_schema: Dict[str, Any]
+) -> List[Any]:
+    """
+    Sends a branch generation prompt and returns the parsed list of branches,
+    or an empty list if no usable response arrived.
+    """
+    llm_client = get_llm_client()
+
+    async def _attempt(attempt: int) -> List[Any]:
+        response = await llm_client.acomplete(
+            prompt=prompt if attempt == 0 else prompt + STRICT_JSON_SUFFIX,
+            system=system,
+            response_schema=response_schema,
+        )
+        if not (response and response.content):
+            raise InvalidResponseError("Empty branch response.")
+        try:
+            # The response format guarantees a JSON string, so we parse it.
+            result = json.loads(response.content)
+        except json.JSONDecodeError as exc:
+            # The LLM failed to return valid JSON.
+            raise InvalidResponseError("Branch response is not valid JSON.") from exc
+
+        # TODO: Add more robust validation here
+        if not isinstance(result, dict):
+            raise InvalidResponseError("Branch response is not a JSON object.")
+        branches = result.get("branches")
+        if not isinstance(branches, list):
+            raise InvalidResponseError("Branch response has no list of branches.")
+        return branches
+
+    # A malformed response is retried with a stricter prompt rather than
+    # discarding the whole paid call.
+    try:
+        return await with_retry(_attempt)
+    except InvalidResponseError:
+        return []
+
+
 async def generate_branches(
     parent_summary: str,
     context_blocks: List[ContextBlock],
@@ -30,32 +82,45 @@ async def generate_branches(
         A list of Branch objects, where each object contains the decision
         text and a list of tradeoffs.
     """
-    llm_client = get_llm_client()
-
-    context_text = "\n".join(
-        f"- {block.role.replace('_', ' ').title()}: {block.text}"
-        for block in context_blocks
-    )
-
-    prompt = BRANCH_GENERATION_PROMPT.format(
+    prompt = BRANCH_GENERATION_USER_SUFFIX.format(
         parent_summary=parent_summary,
-        context_text=context_text,
+        context_text=format_context(context_blocks),
         max_children=max_children,
     )
+    return await _request_branches(
+        prompt, BRANCH_GENERATION_SYSTEM_PREFIX, BRANCH_SCHEMA
+    )
 
-    response = await llm_client.acomplete(prompt=prompt)
-    if not (response and response.content):
-        return []
 
-    json_content = extract_json_from_markdown(response.content) or response.content
+async def generate_branches_with_annotations(
+    parent_summary: str,
+    context_blocks: List[ContextBlock],
+    max_children: int,
+) -> List[AnnotatedBranch]:
+    """
+    Generates the next steps after a decision together with their risk,
+    growth, and emotion tags, in a single LLM call instead of one call for
+    the branches plus one per branch for its tags.
 
-    try:
-        # The response should be a JSON string, so we parse it.
-        branches = json.loads(json_content)
-        # TODO: Add more robust validation here
-        if isinstance(branches, list):
-            return branches
-        return []
-    except json.JSONDecodeError:
-        # The LLM failed to return valid JSON.
-        return []
+    Args:
+        parent_summary: The summary of the parent node's decision.
+        context_blocks: A list of ContextBlock objects providing the full context.
+        max_children: The desired number of branches to generate.
+
+    Returns:
+        A list of AnnotatedBranch objects. A branch whose tags were missing
+        or malformed in the response has empty tags.
+    """
+    prompt = BRANCH_GENERATION_USER_SUFFIX.format(
+        parent_summary=parent_summary,
+        context_text=format_context(context_blocks),
+        max_children=max_children,
+    )
+    branches = await _request_branches(
+        prompt, ANNOTATED_BRANCH_GENERATION_SYSTEM_PREFIX, ANNOTATED_BRANCH_SCHEMA
+    )
+    branches = [branch for branch in branches if isinstance(branch, dict)]
+    for branch in branches:
+        if not isinstance(branch.get("tags"), dict):
+            branch["tags"] = {}
+    return branches
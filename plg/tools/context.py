@@ -1,4 +1,5 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 import typer
 from rich import print
 from rich.console import Console
@@ -48,6 +49,33 @@ Be as detailed as you feel necessary.
     return context_data
 
 
+@lru_cache(maxsize=128)
+def _format_context_items(items: Tuple[Tuple[str, str], ...]) -> str:
+    """Joins `(role, text)` pairs into the bullet list used in prompts."""
+    return "\n".join(
+        f"- {role.replace('_', ' ').title()}: {text}" for role, text in items
+    )
+
+
+def format_context(context_blocks: List[ContextBlock]) -> str:
+    """
+    Formats context blocks into the bullet list used in prompts.
+
+    The result is memoized on the blocks' roles and texts, so expanding
+    many branches of one tree formats the shared context only once, and
+    every prompt built from it starts with identical bytes.
+
+    Args:
+        context_blocks: The ContextBlock objects to format.
+
+    Returns:
+        One "- Role: text" line per block.
+    """
+    return _format_context_items(
+        tuple((block.role, block.text) for block in context_blocks)
+    )
+
+
 async def summarise_context(context_blocks: List[ContextBlock]) -> str:
     """
     Takes a list of ContextBlock objects, formats them into a prompt,
@@ -63,10 +91,7 @@ async def summarise_context(context_blocks: List[ContextBlock]) -> str:
     llm_client = get_llm_client()
 
     # Format the context blocks into a single prompt for the LLM
-    context_text = "\n".join(
-        f"- {block.role.replace('_', ' ').title()}: {block.text}"
-        for block in context_blocks
-    )
+    context_text = format_context(context_blocks)
     prompt = CONTEXT_SUMMARY_PROMPT.format(context_text=context_text)
 
     response = await llm_client.acomplete(prompt=prompt)
@@ -1,93 +1,110 @@
-import json
+from functools import lru_cache
+from typing import Tuple
+
 from rich.tree import Tree
 from sqlmodel import Session
 
-from plg.models.models import BranchNode
+from plg.models.models import BranchNode, Decision
+from plg.models.queries import Subtree, load_subtree
 
+# Label templates, filled with `str.format_map` once per node.
+_ROOT_TEMPLATE = "[bold]📍 Root Context (ID: {id})[/bold]\n\n[italic]{summary}[/italic]"
+_TITLE_TEMPLATE = "📍 Decision (ID: {id}): {text}"
+_TAGS_TEMPLATE = "Tags: [Risk: {risk}] [Growth: {growth}] [Emotion: {emotion}]"
+# Replaces the pro/con markers of a tradeoff in a single pass.
+_TRADEOFF_MARKS = str.maketrans({"+": "✔", "-": "✘"})
 
-def _get_compact_tradeoffs(tradeoffs: list) -> list:
-    """Selects and formats a compact list of tradeoffs."""
-    pros = [t for t in tradeoffs if t.startswith("+")]
-    cons = [t for t in tradeoffs if t.startswith("-")]
 
-    compact_list = []
-    if pros:
-        compact_list.append(pros[0])
-    if cons:
-        compact_list.append(cons[0])
-    if len(compact_list) < 2 and len(pros) > 1:
-        compact_list.append(pros[1])
+class _TagValues(dict):
+    """Tag values for `_TAGS_TEMPLATE`, with "N/A" for any missing tag."""
 
-    return [t.replace("+", "✔").replace("-", "✘") for t in compact_list]
+    def __missing__(self, key: str) -> str:
+        return "N/A"
 
 
-async def _build_rich_tree_level(
-    node: BranchNode, tree: Tree, session: Session, is_root: bool = False
-):
+@lru_cache(maxsize=4096)
+def _get_compact_tradeoffs(tradeoffs: Tuple[str, ...]) -> Tuple[str, ...]:
     """
-    Recursively builds a `rich.tree.Tree` by fetching data for a node
-    and all its children.
+    Selects and formats a compact list of tradeoffs. Memoized, so rendering
+    the same decision again doesn't redo the work.
     """
-    if not node.decision:
-        return
+    first_pro = second_pro = first_con = None
+    for t in tradeoffs:
+        if t.startswith("+"):
+            if first_pro is None:
+                first_pro = t
+            elif second_pro is None:
+                second_pro = t
+        elif t.startswith("-") and first_con is None:
+            first_con = t
+        if first_pro is not None and first_con is not None:
+            break
+
+    # A second pro only fills the slot of a missing con.
+    if first_con is not None:
+        compact = (first_pro, first_con)
+    else:
+        compact = (first_pro, second_pro)
+    return tuple(t.translate(_TRADEOFF_MARKS) for t in compact if t is not None)
 
-    decision = node.decision
-    node_label = ""
 
+def _make_node_label(decision: Decision, is_root: bool = False) -> str:
+    """Formats the label shown for a decision in the tree view."""
     if is_root:
-        title = f"📍 Root Context (ID: {decision.id})"
-        summary = decision.summary or "No summary available."
-        node_label = f"[bold]{title}[/bold]\n\n[italic]{summary}[/italic]"
+        node_label = _ROOT_TEMPLATE.format_map(
+            {"id": decision.id, "summary": decision.summary or "No summary available."}
+        )
     else:
+        # Only non-empty lines are appended, in display order.
         # 1. Title
-        title = decision.text
-        title_line = f"📍 Decision (ID: {decision.id}): {title}"
+        lines = [_TITLE_TEMPLATE.format_map({"id": decision.id, "text": decision.text})]
 
         # 2. Tags
-        tags_line = ""
         if decision.tags:
-            try:
-                tags = json.loads(decision.tags)
-                risk = tags.get("risk", "N/A")
-                growth = tags.get("growth", "N/A")
-                emotion = tags.get("emotion", "N/A")
-                tags_line = (
-                    f"Tags: [Risk: {risk}] [Growth: {growth}] [Emotion: {emotion}]"
-                )
-            except (json.JSONDecodeError, TypeError):
-                tags_line = "Tags: Error parsing tags"
+            if isinstance(decision.tags, dict):
+                lines.append(_TAGS_TEMPLATE.format_map(_TagValues(decision.tags)))
+            else:
+                lines.append("Tags: Error parsing tags")
 
         # 3. Summary (first sentence)
-        summary_line = ""
         if decision.summary:
-            summary = decision.summary.split(".")[0] + "."
-            summary_line = f"Summary: {summary}"
+            end = decision.summary.find(".")
+            if end == -1:
+                summary = decision.summary + "."
+            else:
+                summary = decision.summary[: end + 1]
+            lines.append(f"Summary: {summary}")
 
         # 4. Tradeoffs (compact view)
-        tradeoffs_lines = []
         if decision.tradeoffs:
-            try:
-                tradeoffs = json.loads(decision.tradeoffs)
-                if tradeoffs:
-                    compact_tradeoffs = _get_compact_tradeoffs(tradeoffs)
-                    tradeoffs_lines.append("Tradeoffs:")
-                    for t in compact_tradeoffs:
-                        tradeoffs_lines.append(f"  {t}")
-            except (json.JSONDecodeError, TypeError):
-                tradeoffs_lines.append("Tradeoffs: Error parsing")
+            if isinstance(decision.tradeoffs, list):
+                lines.append("Tradeoffs:")
+                for t in _get_compact_tradeoffs(tuple(decision.tradeoffs)):
+                    lines.append(f"  {t}")
+            else:
+                lines.append("Tradeoffs: Error parsing")
 
-        # 5. Assemble the node content
-        content = [title_line, tags_line, summary_line]
-        if tradeoffs_lines:
-            content.extend(tradeoffs_lines)
+        node_label = "\n".join(lines)
 
-        node_label = "\n".join(line for line in content if line)
+    return node_label
 
-    branch = tree.add(node_label)
 
-    # Recursively call for children.
-    for child_node in node.children:
-        await _build_rich_tree_level(child_node, branch, session)
+def _build_rich_tree(start_node: BranchNode, tree: Tree, subtree: Subtree) -> None:
+    """
+    Adds a node and all its descendants to a `rich.tree.Tree`, reading them
+    from the preloaded subtree instead of the database. The walk uses an
+    explicit stack, so deep trees can't hit the recursion limit. Nodes
+    without a decision are skipped along with their descendants.
+    """
+    stack = [(start_node, tree, True)]
+    while stack:
+        node, parent_tree, is_root = stack.pop()
+        if not node.decision:
+            continue
+        branch = parent_tree.add(_make_node_label(node.decision, is_root))
+        # Pushed in reverse, so children are popped and added in order.
+        for child_node in reversed(subtree.children(node)):
+            stack.append((child_node, branch, False))
 
 
 async def generate_tree_view(start_node_id: int, session: Session) -> Tree:
@@ -101,12 +118,15 @@ async def generate_tree_view(start_node_id: int, session: Session) -> Tree:
     Returns:
         A `rich.tree.Tree` object ready to be printed.
     """
-    start_node = session.get(BranchNode, start_node_id)
-    if not start_node or not start_node.decision:
+    # The whole subtree and its decisions are loaded with one query, so
+    # building the tree below does not trigger any lazy loads.
+    subtree = load_subtree(session, start_node_id)
+    if not subtree or not subtree.root.decision:
         return Tree("[bold red]Error: Start node not found.[/bold red]")
+    start_node = subtree.root
 
     tree = Tree(
         f"🌳 [bold green]Decision Tree starting from Decision ID: {start_node.decision.id}[/bold green]"
     )
-    await _build_rich_tree_level(start_node, tree, session, is_root=True)
+    _build_rich_tree(start_node, tree, subtree)
     return tree
@@ -1,23 +1,30 @@
-import json
-from typing import List
+import asyncio
+from contextlib import nullcontext
+from typing import List, Optional, Tuple
 
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
+from rich.progress import Progress, SpinnerColumn, TaskID, TextColumn, BarColumn
 from sqlmodel import select, Session
 
 from plg.models.db import get_session
-from plg.models.models import BranchNode, Decision
-from plg.tools.analysis import annotate_branch
-from plg.tools.branching import generate_branches
+from plg.models.models import BranchNode, ContextBlock, Decision
+from plg.models.queries import count_subtree
+from plg.tools.analysis import annotate_decisions
+from plg.tools.branching import AnnotatedBranch, generate_branches_with_annotations
 from plg.tools.exceptions import MaxNodesExceededError
 
 
-def _get_start_node(session: Session, start_decision_id: int) -> BranchNode:
-    """Finds or creates the starting BranchNode for the expansion."""
+def _get_start_node(
+    session: Session, start_decision_id: int
+) -> Tuple[BranchNode, bool]:
+    """
+    Finds or creates the starting BranchNode for the expansion. Also returns
+    whether the node was newly created.
+    """
     node = session.exec(
         select(BranchNode).where(BranchNode.decision_id == start_decision_id)
     ).first()
     if node:
-        return node
+        return node, False
 
     decision = session.get(Decision, start_decision_id)
     if not decision:
@@ -27,10 +34,38 @@ def _get_start_node(session: Session, start_decision_id: int) -> BranchNode:
     session.add(new_node)
     session.commit()
     session.refresh(new_node)
-    return new_node
+    return new_node, True
 
 
-async def expand_tree_bfs(start_decision_id: int, max_depth: int, max_children: int):
+async def _expand_parent(
+    parent_node: BranchNode,
+    context_blocks: List[ContextBlock],
+    max_children: int,
+) -> List[AnnotatedBranch]:
+    """
+    Generates the annotated children of one node. Nothing is added to the
+    session here, so several parents can be expanded concurrently.
+
+    Branches and their tags come from one fused LLM call. Branches whose tags
+    were malformed are left untagged, to be annotated with the whole level.
+    """
+    parent_decision = parent_node.decision
+    summary = parent_decision.summary or parent_decision.text
+
+    return await generate_branches_with_annotations(
+        parent_summary=summary,
+        context_blocks=context_blocks,
+        max_children=max_children,
+    )
+
+
+async def expand_tree_bfs(
+    start_decision_id: int,
+    max_depth: int,
+    max_children: int,
+    session: Optional[Session] = None,
+    max_workers: int = 8,
+):
     """
     Expands a decision tree using a Breadth-First Search (BFS) approach.
 
@@ -38,13 +73,18 @@ async def expand_tree_bfs(start_decision_id: int, max_depth: int, max_children:
         start_decision_id: The ID of the Decision to start the expansion from.
         max_depth: The maximum depth to expand the tree to.
         max_children: The number of child branches to generate for each node.
+        session: An optional active database session to reuse. If omitted,
+                 a new session is opened for the expansion.
+        max_workers: The maximum number of nodes of a level expanded at once.
 
     Raises:
         MaxNodesExceededError: If the number of nodes exceeds 50.
     """
-    with get_session() as session:
+    with (
+        nullcontext(session) if session is not None else get_session()
+    ) as active_session:
         try:
-            start_node = _get_start_node(session, start_decision_id)
+            start_node, created = _get_start_node(active_session, start_decision_id)
             print(
                 f"Starting tree expansion from Decision ID {start_decision_id} (BranchNode ID {start_node.id})..."
             )
@@ -52,81 +92,107 @@ async def expand_tree_bfs(start_decision_id: int, max_depth: int, max_children:
             print(f"[bold red]Error:[/bold red] {e}")
             return
 
-        queue: List[BranchNode] = [start_node]
-        node_count = 1
+        frontier: List[BranchNode] = [start_node]
+        # An existing start node may already have descendants, which count
+        # towards the limit.
+        node_count = 1 if created else count_subtree(active_session, start_node.id)
         max_nodes = 50
 
-        # Get the context from the root node, to be passed down.
-        root_decision = session.get(Decision, start_decision_id)
+        # Get the context from the root node, to be passed down. The start
+        # node already holds its decision, so no second lookup is needed.
+        root_decision = start_node.decision
         if not root_decision:
             print("[bold red]Error:[/bold red] Root decision not found.")
             return
         root_context_blocks = root_decision.context_blocks
 
-        for depth in range(max_depth):
-            level_size = len(queue)
-            print(f"Expanding level {depth + 1} with {level_size} nodes...")
-            if level_size == 0:
-                print("No more nodes to expand.")
-                break
-
-            next_level_nodes = []
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TextColumn("{task.completed}/{task.total}"),
-                transient=True,
-            ) as progress:
+        if max_depth <= 0:
+            print("Tree expansion complete.")
+            return
+
+        semaphore = asyncio.Semaphore(max_workers)
+
+        # One progress display is shared by every level, with a task per level.
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TextColumn("{task.completed}/{task.total}"),
+            transient=True,
+        ) as progress:
+            for depth in range(max_depth):
+                # Each level expands a snapshot of the frontier into a new list,
+                # which becomes the frontier of the next level.
+                level_size = len(frontier)
+                print(f"Expanding level {depth + 1} with {level_size} nodes...")
+                if level_size == 0:
+                    print("No more nodes to expand.")
+                    break
+
+                parents = [node for node in frontier if node.decision]
+                if parents and node_count >= max_nodes:
+                    active_session.commit()
+                    raise MaxNodesExceededError()
+
                 task = progress.add_task(
                     f"Generating children for level {depth + 1}", total=level_size
                 )
-                for _ in range(level_size):
-                    parent_node = queue.pop(0)
-                    progress.update(task, advance=1)
-                    parent_decision = parent_node.decision
-
-                    if not parent_decision:
-                        continue
-
-                    if node_count >= max_nodes:
-                        session.commit()
-                        raise MaxNodesExceededError()
-
-                    summary = parent_decision.summary or parent_decision.text
-
-                    branches = await generate_branches(
-                        parent_summary=summary,
-                        context_blocks=root_context_blocks,
-                        max_children=max_children,
-                    )
-
-                    for branch in branches:
-                        if node_count >= max_nodes:
-                            session.commit()  # Save progress before stopping
-                            raise MaxNodesExceededError()
-
-                        branch_text = branch["decision"]
-                        tradeoffs = branch["tradeoffs"]
-                        annotations = await annotate_branch(branch_text)
-
-                        child_decision = Decision(
-                            text=branch_text,
-                            tradeoffs=json.dumps(tradeoffs),
-                            tags=json.dumps(annotations),
-                        )
-                        child_node = BranchNode(
-                            decision=child_decision, parent=parent_node
+                progress.update(task, advance=level_size - len(parents))
+
+                async def _expand(
+                    parent_node: BranchNode, task_id: TaskID
+                ) -> List[AnnotatedBranch]:
+                    async with semaphore:
+                        children = await _expand_parent(
+                            parent_node, root_context_blocks, max_children
                         )
-                        session.add(child_decision)
-                        session.add(child_node)
-                        next_level_nodes.append(child_node)
-                        node_count += 1
-
-            session.commit()
-            for node in next_level_nodes:
-                session.refresh(node)
-
-            queue.extend(next_level_nodes)
+                    progress.update(task_id, advance=1)
+                    return children
+
+                # Every parent of the level is expanded concurrently. The
+                # results are added to the session afterwards, in order.
+                results = await asyncio.gather(*[_expand(p, task) for p in parents])
+                progress.remove_task(task)
+
+                # Only the children that fit under the node limit are kept.
+                children = [
+                    (parent_node, branch)
+                    for parent_node, branches in zip(parents, results)
+                    for branch in branches
+                ]
+                kept = children[: max(max_nodes - node_count, 0)]
+
+                new_decisions = [
+                    Decision(
+                        text=branch["decision"],
+                        tradeoffs=branch["tradeoffs"],
+                        tags=branch["tags"],
+                    )
+                    for _, branch in kept
+                ]
+                # Children whose tags were malformed are annotated across the
+                # whole level with bulk calls, which write the tags back.
+                untagged = [decision for decision in new_decisions if not decision.tags]
+                if untagged:
+                    await annotate_decisions(untagged, max_workers=max_workers)
+
+                # The new rows of the level are added together and written with
+                # one commit. The session keeps them loaded after the commit, so
+                # their IDs and relationships are read without a refresh.
+                next_frontier = [
+                    BranchNode(decision=child_decision, parent=parent_node)
+                    for (parent_node, _), child_decision in zip(kept, new_decisions)
+                ]
+                node_count += len(kept)
+
+                active_session.add_all(new_decisions)
+                active_session.add_all(next_frontier)
+                active_session.commit()
+
+                if len(kept) < len(children):
+                    # Progress up to the limit is saved before stopping.
+                    raise MaxNodesExceededError()
+
+                frontier = next_frontier
 
     print("Tree expansion complete.")
@@ -1,33 +1,110 @@
-from unittest.mock import patch
+from contextlib import contextmanager
 
 import pytest
-from sqlmodel import create_engine
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, create_engine
 
-from plg.models.db import get_session as original_get_session, init_database_if_needed
+from plg.models.db import get_session as original_get_session
 from plg.models.models import SQLModel
 
+# Every module that imports get_session for the CLI commands.
+_GET_SESSION_TARGETS = (
+    "plg.cli.get_session",
+    "plg.models.db.get_session",
+    "plg.tools.tree.get_session",
+)
 
-@pytest.fixture(scope="function")
-def setup_test_db():
+# The connection of the test currently using `setup_test_db`, if any.
+_test_connection = None
+
+
+@contextmanager
+def get_test_session(db_engine=None):
     """
-    Fixture to set up and tear down an in-memory SQLite database for tests.
-    It also patches the get_session function to use the test database.
+    Stands in for get_session, joining the current test's transaction so
+    that everything the test writes is rolled back when it finishes.
     """
-    # In a real CI environment, the home directory might not exist.
-    # This ensures the .plg directory is created.
-    init_database_if_needed()
+    if _test_connection is None:
+        with original_get_session(db_engine) as session:
+            yield session
+        return
+
+    # Commits only release a savepoint; the outer transaction stays open.
+    session = Session(
+        bind=_test_connection,
+        expire_on_commit=False,
+        join_transaction_mode="create_savepoint",
+    )
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def test_engine():
+    """
+    Provides an in-memory SQLite engine whose schema is created once for
+    the whole test session.
+    """
+    # A single shared connection, since every connection to an in-memory
+    # database would otherwise see its own empty database.
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+    # pysqlite defers BEGIN until the first write and ignores SAVEPOINTs
+    # inside it, so the transaction is begun explicitly instead.
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _emit_begin(connection):
+        connection.exec_driver_sql("BEGIN")
 
-    engine = create_engine("sqlite:///:memory:")
     SQLModel.metadata.create_all(engine)
+    yield engine
+    SQLModel.metadata.drop_all(engine)
+    engine.dispose()
 
-    def get_test_session():
-        with original_get_session(engine) as session:
-            yield session
 
-    # Patch get_session in all the places it's used by the CLI commands
-    with patch("plg.cli.get_session", new=get_test_session), patch(
-        "plg.models.db.get_session", new=get_test_session
-    ), patch("plg.tools.tree.get_session", new=get_test_session):
+@pytest.fixture(scope="session")
+def patch_get_session():
+    """Patches get_session in all the places it's used by the CLI commands."""
+    with pytest.MonkeyPatch.context() as mp:
+        for target in _GET_SESSION_TARGETS:
+            mp.setattr(target, get_test_session)
         yield
 
-    SQLModel.metadata.drop_all(engine)
+
+@pytest.fixture(scope="function")
+def setup_test_db(test_engine, patch_get_session):
+    """
+    Fixture to run a test inside a transaction on the shared test database,
+    rolled back at teardown so each test starts from an empty database.
+    """
+    global _test_connection
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    _test_connection = connection
+    try:
+        yield
+    finally:
+        _test_connection = None
+        transaction.rollback()
+        connection.close()
+
+
+@pytest.fixture
+def db_session(setup_test_db):
+    """Provides a session on the shared test database, rolled back after the test."""
+    with get_test_session() as session:
+        yield session
@@ -0,0 +1,80 @@
+import io
+from unittest.mock import AsyncMock
+
+import pytest
+
+from plg.export.markdown import write_tree_markdown
+from plg.export.mermaid import render_tree_to_mermaid
+from plg.models.models import BranchNode, Decision
+
+
+@pytest.fixture
+def tree_session(db_session):
+    """
+    Provides a session on the test database holding a small tree: a root
+    with two children, the first of which has not been annotated yet.
+    """
+    tags = {"risk": "Low", "growth": "High", "emotion": "Hopeful"}
+    root = BranchNode(decision=Decision(text="Root", tags=tags))
+    BranchNode(decision=Decision(text='Say "yes"'), parent=root)
+    BranchNode(decision=Decision(text="Say no", tags=tags), parent=root)
+    db_session.add(root)
+    db_session.commit()
+    return db_session, root.id
+
+
+@pytest.fixture
+def mock_annotate(monkeypatch):
+    """Patches the LLM-backed bulk annotation used on a persisted-tags miss."""
+    annotate = AsyncMock(
+        side_effect=lambda texts, use_cache=True: [
+            {"risk": "High", "growth": "Low", "emotion": "Torn"} for _ in texts
+        ]
+    )
+    monkeypatch.setattr("plg.tools.analysis.annotate_branches_bulk", annotate)
+    return annotate
+
+
+@pytest.mark.asyncio
+async def test_write_tree_markdown(tree_session, mock_annotate):
+    """
+    Verify the markdown export nests children in order and only annotates
+    decisions without persisted tags.
+    """
+    session, root_id = tree_session
+
+    sink = io.StringIO()
+    await write_tree_markdown(root_id, session, sink)
+    content = sink.getvalue()
+
+    assert content == (
+        "# Decision Tree Export\n\nStarting from Decision ID: 1\n\n"
+        "- **Decision (ID: 1)**: Root\n"
+        "  - *Tags: [Risk: Low] [Growth: High] [Emotion: Hopeful]*\n"
+        '  - **Decision (ID: 2)**: Say "yes"\n'
+        "    - *Tags: [Risk: High] [Growth: Low] [Emotion: Torn]*\n"
+        "  - **Decision (ID: 3)**: Say no\n"
+        "    - *Tags: [Risk: Low] [Growth: High] [Emotion: Hopeful]*\n"
+    )
+    mock_annotate.assert_awaited_once_with(['Say "yes"'], use_cache=True)
+
+
+@pytest.mark.asyncio
+async def test_render_tree_to_mermaid(tree_session, mock_annotate):
+    """
+    Verify the Mermaid export escapes quotes and emits nodes, then edges,
+    sorted by decision ID.
+    """
+    session, root_id = tree_session
+
+    content = await render_tree_to_mermaid(root_id, session)
+
+    assert content == (
+        "graph TD\n"
+        '    D1["Root<br/>[Risk: Low] [Growth: High] [Emotion: Hopeful]"]\n'
+        '    D2["Say #quot;yes#quot;<br/>[Risk: High] [Growth: Low] [Emotion: Torn]"]\n'
+        '    D3["Say no<br/>[Risk: Low] [Growth: High] [Emotion: Hopeful]"]\n'
+        "    D1 --> D2\n"
+        "    D1 --> D3\n"
+    )
+    mock_annotate.assert_awaited_once_with(['Say "yes"'], use_cache=True)
@@ -0,0 +1,52 @@
+import datetime
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine
+
+from plg.llm.cache import LLMCache, make_cache_key
+
+
+@pytest.fixture
+def cache():
+    """An LLMCache backed by a throwaway in-memory database."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    return LLMCache(engine=engine)
+
+
+def test_cache_key_is_deterministic():
+    """Identical requests share a key; any difference yields a new one."""
+    key = make_cache_key("model-a", "Hello")
+    assert key == make_cache_key("model-a", "Hello")
+    assert key != make_cache_key("model-b", "Hello")
+    assert key != make_cache_key("model-a", "Hello", tools=[{"name": "t"}])
+
+
+def test_get_returns_stored_response(cache):
+    """A stored response is returned for its key, and misses return None."""
+    cache.set("key", "model-a", '{"content": "hi"}')
+
+    assert cache.get("key") == '{"content": "hi"}'
+    assert cache.get("other") is None
+
+
+def test_expired_entries_are_dropped(cache):
+    """Entries older than their TTL count as misses."""
+    cache.ttl = datetime.timedelta(seconds=0)
+    cache.set("key", "model-a", '{"content": "hi"}')
+
+    assert cache.get("key") is None
+
+
+def test_delete_removes_an_entry(cache):
+    """A deleted key misses, and deleting a missing key is harmless."""
+    cache.set("key", "model-a", '{"content": "hi"}')
+
+    cache.delete("key")
+    cache.delete("other")
+
+    assert cache.get("key") is None
@@ -7,6 +7,14 @@ from plg.config import Settings
 from plg.llm.factory import get_llm_client
 
 
+@pytest.fixture(autouse=True)
+def clear_client_cache():
+    """Ensures each test builds its own client instead of the shared one."""
+    get_llm_client.cache_clear()
+    yield
+    get_llm_client.cache_clear()
+
+
 def test_get_llm_client_returns_openai_client(monkeypatch):
     """
     Verify that get_llm_client returns an OpenAIClient when the provider
@@ -43,3 +51,31 @@ def test_get_llm_client_raises_for_unsupported_provider(monkeypatch):
         get_llm_client()
 
     assert "anthropic' is not supported" in str(excinfo.value)
+
+
+def test_get_llm_client_returns_shared_instance(monkeypatch):
+    """
+    Verify that repeated calls to get_llm_client return the same client.
+    """
+    mock_settings = Settings(
+        OPENAI_API_KEY=SecretStr("fake-key"), LLM_PROVIDER="openai"
+    )
+    monkeypatch.setattr("plg.llm.factory.get_settings", lambda: mock_settings)
+    monkeypatch.setattr("plg.llm.factory.OpenAIClient", MagicMock)
+
+    assert get_llm_client() is get_llm_client()
+
+
+def test_get_llm_client_returns_batch_client(monkeypatch):
+    """
+    Verify that the 'openai_batch' provider selects the Batch API client.
+    """
+    mock_settings = Settings(
+        OPENAI_API_KEY=SecretStr("fake-key"), LLM_PROVIDER="openai_batch"
+    )
+    monkeypatch.setattr("plg.llm.factory.get_settings", lambda: mock_settings)
+    monkeypatch.setattr(
+        "plg.llm.openai_batch_client.BatchOpenAIClient", MagicMock(return_value="batch")
+    )
+
+    assert get_llm_client() == "batch"
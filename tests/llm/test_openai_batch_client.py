@@ -0,0 +1,112 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pydantic import SecretStr
+
+from plg.config import Settings
+from plg.llm.openai_batch_client import BatchOpenAIClient
+
+
+@pytest.fixture
+def mock_openai(monkeypatch):
+    """Patches settings and the AsyncOpenAI client with Batch API mocks."""
+    monkeypatch.setattr(
+        "plg.llm.openai_client.get_settings",
+        lambda: Settings(OPENAI_API_KEY=SecretStr("fake-api-key")),
+    )
+    instance = MagicMock()
+    uploaded = {}
+    # Prompts whose requests fail inside the batch.
+    instance.failing_prompts = set()
+
+    async def create_file(file, purpose):
+        uploaded["lines"] = [json.loads(line) for line in file[1].splitlines()]
+        return SimpleNamespace(id="file-in")
+
+    async def file_content(file_id):
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": request["custom_id"],
+                    "response": {
+                        "status_code": (
+                            500
+                            if request["body"]["messages"][-1]["content"]
+                            in instance.failing_prompts
+                            else 200
+                        ),
+                        "body": {
+                            "choices": [
+                                {
+                                    "message": {
+                                        "role": "assistant",
+                                        "content": request["body"]["messages"][-1][
+                                            "content"
+                                        ].upper(),
+                                    }
+                                }
+                            ]
+                        },
+                    },
+                }
+            )
+            for request in uploaded["lines"]
+        ]
+        return SimpleNamespace(text="\n".join(lines))
+
+    instance.files.create = AsyncMock(side_effect=create_file)
+    instance.files.content = AsyncMock(side_effect=file_content)
+    instance.batches.create = AsyncMock(return_value=SimpleNamespace(id="batch-1"))
+    instance.batches.retrieve = AsyncMock(
+        side_effect=[
+            SimpleNamespace(status="in_progress", output_file_id=None),
+            SimpleNamespace(status="completed", output_file_id="file-out"),
+        ]
+    )
+    monkeypatch.setattr(
+        "plg.llm.openai_client.openai.AsyncOpenAI",
+        lambda api_key, http_client, max_retries: instance,
+    )
+    return instance
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_one_batch(mock_openai):
+    """
+    Verify that concurrent calls are submitted as one batch and each call
+    receives its own result.
+    """
+    client = BatchOpenAIClient(flush_interval=0.01, poll_interval=0)
+
+    first, second = await asyncio.gather(
+        client.acomplete(prompt="first"), client.acomplete(prompt="second")
+    )
+
+    assert (first.content, second.content) == ("FIRST", "SECOND")
+    mock_openai.files.create.assert_called_once()
+    mock_openai.batches.create.assert_called_once_with(
+        input_file_id="file-in",
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    assert mock_openai.batches.retrieve.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_request_in_batch_resolves_to_empty_message(mock_openai):
+    """
+    Verify that a request that fails inside a completed batch resolves to an
+    empty message without failing the other requests in the batch.
+    """
+    mock_openai.failing_prompts.add("second")
+    client = BatchOpenAIClient(flush_interval=0.01, poll_interval=0)
+
+    first, second = await asyncio.gather(
+        client.acomplete(prompt="first"), client.acomplete(prompt="second")
+    )
+
+    assert first.content == "FIRST"
+    assert second.content is None
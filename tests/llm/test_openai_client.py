@@ -1,62 +1,335 @@
+import json
+
+import httpx
+import openai
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 
 from pydantic import SecretStr
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine
 from openai.types.chat import ChatCompletionMessage
 from openai.types.chat.chat_completion import ChatCompletion, Choice
 
 from plg.config import Settings
-from plg.llm.openai_client import OpenAIClient
+from plg.llm.cache import LLMCache
+from plg.llm.openai_client import OpenAIClient, _response_format
 
 
-@pytest.mark.asyncio
-async def test_simple_call_returns_non_empty_text(monkeypatch):
-    """
-    Verify that a simple call to acomplete returns a message with non-empty text.
-    """
-    # Arrange
-    # 1. Mock settings to avoid dependency on environment variables
-    mock_settings = Settings(
-        OPENAI_API_KEY=SecretStr("fake-api-key"),
-        LLM_PROVIDER="openai",
-        MODEL_NAME="gpt-4-turbo-preview",
-    )
-    monkeypatch.setattr("plg.llm.openai_client.get_settings", lambda: mock_settings)
-
-    # 2. Prepare the mock response from the API
-    mock_choice = Choice(
-        finish_reason="stop",
-        index=0,
-        message=ChatCompletionMessage(
-            role="assistant", content="This is a test response."
-        ),
-    )
-    mock_completion = ChatCompletion(
+def _completion(content: str) -> ChatCompletion:
+    """Builds a chat completion whose single choice holds `content`."""
+    return ChatCompletion(
         id="chatcmpl-test",
-        choices=[mock_choice],
+        choices=[
+            Choice(
+                finish_reason="stop",
+                index=0,
+                message=ChatCompletionMessage(role="assistant", content=content),
+            )
+        ],
         created=1677652288,
-        model=mock_settings.MODEL_NAME,
+        model="gpt-4-turbo-preview",
         object="chat.completion",
     )
 
-    # 3. Mock the entire AsyncOpenAI client that gets instantiated
-    mock_async_openai_instance = MagicMock()
-    mock_async_openai_instance.chat.completions.create = AsyncMock(
-        return_value=mock_completion
+
+def _api_error(error_type, status_code: int, message: str):
+    """Builds an OpenAI API error carrying a response with `status_code`."""
+    return error_type(
+        message,
+        response=httpx.Response(
+            status_code, request=httpx.Request("POST", "https://x")
+        ),
+        body=None,
     )
+
+
+@pytest.fixture
+def mock_openai(monkeypatch):
+    """
+    Patches the AsyncOpenAI client, and backoff sleeps, with mocks. Chat
+    completions reply "ok" unless a test sets its own return value.
+    """
+    api = MagicMock()
+    api.chat.completions.create = AsyncMock(return_value=_completion("ok"))
+    api.embeddings.create = AsyncMock()
     monkeypatch.setattr(
         "plg.llm.openai_client.openai.AsyncOpenAI",
-        lambda api_key: mock_async_openai_instance,
+        lambda api_key, http_client, max_retries: api,
     )
+    monkeypatch.setattr("plg.llm.openai_client.asyncio.sleep", AsyncMock())
+    return api
+
+
+@pytest.fixture
+def make_client(monkeypatch, mock_openai):
+    """Builds an OpenAIClient from fake settings, overridden by keyword."""
+
+    def make(**overrides) -> OpenAIClient:
+        settings = Settings(OPENAI_API_KEY=SecretStr("fake-api-key"), **overrides)
+        monkeypatch.setattr("plg.llm.openai_client.get_settings", lambda: settings)
+        return OpenAIClient()
+
+    return make
+
+
+@pytest.mark.asyncio
+async def test_simple_call_returns_non_empty_text(make_client, mock_openai):
+    """
+    Verify that a simple call to acomplete returns a message with non-empty text.
+    """
+    mock_openai.chat.completions.create.return_value = _completion(
+        "This is a test response."
+    )
+    client = make_client()
 
-    # Act
-    client = OpenAIClient()
     result = await client.acomplete(prompt="Hello, world!")
 
-    # Assert
     assert isinstance(result, ChatCompletionMessage)
     assert result.content == "This is a test response."
-    mock_async_openai_instance.chat.completions.create.assert_called_once_with(
-        model=mock_settings.MODEL_NAME,
+    mock_openai.chat.completions.create.assert_called_once_with(
+        model=client.model_name,
         messages=[{"role": "user", "content": "Hello, world!"}],
+        timeout=client.request_timeout,
+    )
+
+
+@pytest.mark.asyncio
+async def test_cached_call_skips_the_api(make_client, mock_openai):
+    """
+    Verify that a repeated call with use_cache=True is answered from the cache.
+    """
+    mock_openai.chat.completions.create.return_value = _completion("Cached.")
+    store = {}
+    client = make_client()
+    client.cache = MagicMock()
+    client.cache.get.side_effect = store.get
+    client.cache.set.side_effect = lambda key, model, response: store.update(
+        {key: response}
+    )
+
+    first = await client.acomplete(prompt="Tag this.", use_cache=True)
+    second = await client.acomplete(prompt="Tag this.", use_cache=True)
+
+    assert first.content == second.content == "Cached."
+    mock_openai.chat.completions.create.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_system_prefix_is_sent_first(make_client, mock_openai):
+    """
+    Verify that a system prefix is sent as the first message, ahead of the prompt.
+    """
+    client = make_client()
+
+    await client.acomplete(prompt="Decision: move abroad", system="Instructions")
+
+    mock_openai.chat.completions.create.assert_called_once_with(
+        model=client.model_name,
+        messages=[
+            {"role": "system", "content": "Instructions"},
+            {"role": "user", "content": "Decision: move abroad"},
+        ],
+        timeout=client.request_timeout,
+    )
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_call_is_retried(make_client, mock_openai):
+    """
+    Verify that a 429 is retried after a backoff and shrinks the in-flight cap.
+    """
+    mock_openai.chat.completions.create.side_effect = [
+        _api_error(openai.RateLimitError, 429, "Too many requests"),
+        _completion("ok"),
+    ]
+    client = make_client()
+
+    result = await client.acomplete(prompt="Hello")
+
+    assert result.content == "ok"
+    assert mock_openai.chat.completions.create.call_count == 2
+    assert client.rate_limiter.concurrency < client.rate_limiter.max_concurrency
+
+
+def test_response_schema_uses_strictest_supported_format():
+    """
+    Verify that structured-output models get a strict JSON schema and older
+    models fall back to JSON mode.
+    """
+    schema = {"type": "object"}
+
+    assert _response_format("gpt-4o-mini", schema) == {
+        "type": "json_schema",
+        "json_schema": {"name": "response", "schema": schema, "strict": True},
+    }
+    assert _response_format("gpt-4-turbo-preview", schema) == {"type": "json_object"}
+
+
+@pytest.mark.asyncio
+async def test_timed_out_call_is_not_retried(make_client, mock_openai):
+    """
+    Verify that a request that times out is raised at once rather than sent
+    again, so a slow generation isn't paid for several times.
+    """
+    mock_openai.chat.completions.create.side_effect = openai.APITimeoutError(
+        request=httpx.Request("POST", "https://x")
     )
+    client = make_client()
+
+    with pytest.raises(openai.APITimeoutError):
+        await client.acomplete(prompt="Hello")
+
+    assert mock_openai.chat.completions.create.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_call_reraises_after_last_retry(make_client, mock_openai):
+    """
+    Verify that a server error on every attempt is raised once the retries
+    are used up.
+    """
+    mock_openai.chat.completions.create.side_effect = _api_error(
+        openai.InternalServerError, 500, "Server error"
+    )
+    client = make_client()
+
+    with pytest.raises(openai.InternalServerError):
+        await client.acomplete(prompt="Hello")
+
+    calls = mock_openai.chat.completions.create.call_count
+    assert calls == client.max_retries + 1
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_is_off_by_default(make_client, mock_openai):
+    """
+    Verify that an exact-cache miss doesn't request an embedding unless the
+    semantic cache is enabled in the settings.
+    """
+    client = make_client()
+    client.cache = MagicMock()
+    client.cache.get.return_value = None
+
+    await client.acomplete(prompt="Tag this.", use_cache=True, use_semantic_cache=True)
+
+    mock_openai.embeddings.create.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_semantic_cache_embeddings_are_retried(make_client, mock_openai):
+    """
+    Verify that with the semantic cache enabled, a rate-limited embeddings
+    request goes through the limiter and is retried.
+    """
+    embedding = MagicMock()
+    embedding.data = [MagicMock(embedding=[1.0, 0.0])]
+    mock_openai.embeddings.create.side_effect = [
+        _api_error(openai.RateLimitError, 429, "Too many requests"),
+        embedding,
+    ]
+    client = make_client(SEMANTIC_CACHE_ENABLED=True)
+    client.cache = MagicMock()
+    client.cache.get.return_value = None
+    client.semantic_cache = MagicMock(enabled=True)
+    client.semantic_cache.get.return_value = None
+
+    await client.acomplete(prompt="Tag this.", use_semantic_cache=True)
+
+    assert mock_openai.embeddings.create.call_count == 2
+    assert client.rate_limiter.concurrency < client.rate_limiter.max_concurrency
+    client.semantic_cache.get.assert_called_once()
+
+
+def _is_object(content: str) -> bool:
+    """Accepts content that is a JSON object."""
+    try:
+        return isinstance(json.loads(content), dict)
+    except json.JSONDecodeError:
+        return False
+
+
+@pytest.fixture
+def cached_client(make_client):
+    """An OpenAIClient whose response cache is a throwaway in-memory database."""
+    client = make_client()
+    client.cache = LLMCache(
+        engine=create_engine(
+            "sqlite://",
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    )
+    return client
+
+
+@pytest.mark.asyncio
+async def test_rejected_reply_is_not_cached(cached_client, mock_openai):
+    """
+    Verify that a reply the caller's validator rejects is not cached, so the
+    next identical request asks the API again.
+    """
+    mock_openai.chat.completions.create.side_effect = [
+        _completion("[1, 2]"),
+        _completion('{"risk": "Low"}'),
+        _completion("unused"),
+    ]
+
+    first = await cached_client.acomplete(
+        prompt="Tag this.", use_cache=True, validate=_is_object
+    )
+    second = await cached_client.acomplete(
+        prompt="Tag this.", use_cache=True, validate=_is_object
+    )
+    third = await cached_client.acomplete(
+        prompt="Tag this.", use_cache=True, validate=_is_object
+    )
+
+    assert [first.content, second.content, third.content] == [
+        "[1, 2]",
+        '{"risk": "Low"}',
+        '{"risk": "Low"}',
+    ]
+    assert mock_openai.chat.completions.create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_rejected_cached_reply_is_dropped(cached_client, mock_openai):
+    """
+    Verify that a cached reply the validator rejects is deleted and requested
+    again, and the accepted replacement is cached.
+    """
+    await cached_client.acomplete(prompt="Tag this.", use_cache=True)
+    mock_openai.chat.completions.create.return_value = _completion('{"risk": "Low"}')
+
+    replaced = await cached_client.acomplete(
+        prompt="Tag this.", use_cache=True, validate=_is_object
+    )
+    cached = await cached_client.acomplete(
+        prompt="Tag this.", use_cache=True, validate=_is_object
+    )
+
+    assert replaced.content == cached.content == '{"risk": "Low"}'
+    assert mock_openai.chat.completions.create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_reply_is_cached_under_cache_prompt(cached_client, mock_openai):
+    """
+    Verify that a reply to a reworded prompt is cached under `cache_prompt`,
+    so a later request for that prompt is answered without an API call.
+    """
+    mock_openai.chat.completions.create.return_value = _completion('{"risk": "Low"}')
+
+    await cached_client.acomplete(
+        prompt="Tag this. Strictly.",
+        use_cache=True,
+        validate=_is_object,
+        cache_prompt="Tag this.",
+    )
+    cached = await cached_client.acomplete(
+        prompt="Tag this.", use_cache=True, validate=_is_object
+    )
+
+    assert cached.content == '{"risk": "Low"}'
+    mock_openai.chat.completions.create.assert_called_once()
@@ -0,0 +1,45 @@
+import pytest
+
+from plg.llm import rate_limiter
+from plg.llm.rate_limiter import RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_acquire_waits_once_the_bucket_is_empty(monkeypatch):
+    """
+    Verify that requests beyond the per-minute budget wait for a refill.
+    """
+    now = [0.0]
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        now[0] += delay
+
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", fake_sleep)
+    limiter = RateLimiter(
+        requests_per_minute=2, tokens_per_minute=1000, clock=lambda: now[0]
+    )
+
+    await limiter.acquire(10)
+    await limiter.acquire(10)
+    assert sleeps == []
+
+    await limiter.acquire(10)
+    assert sleeps == [pytest.approx(30.0)]
+
+
+def test_concurrency_follows_aimd():
+    """
+    Verify that rate limits cut concurrency by 20% and successes win it back.
+    """
+    limiter = RateLimiter(
+        requests_per_minute=60, tokens_per_minute=1000, max_concurrency=10
+    )
+
+    limiter.record_rate_limited()
+    assert limiter.concurrency == pytest.approx(8.0)
+
+    for _ in range(8):
+        limiter.record_success()
+    assert limiter.concurrency == pytest.approx(9.0)
@@ -0,0 +1,50 @@
+import pytest
+
+from plg.llm import retry
+from plg.llm.retry import InvalidResponseError, with_retry
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    """Skips the backoff delays."""
+
+    async def fake_sleep(delay):
+        pass
+
+    monkeypatch.setattr(retry.asyncio, "sleep", fake_sleep)
+
+
+@pytest.mark.asyncio
+async def test_with_retry_retries_invalid_responses():
+    """Verify that failed attempts are retried with their attempt number."""
+    seen = []
+
+    async def attempt(n):
+        seen.append(n)
+        if n < 2:
+            raise InvalidResponseError()
+        return "ok"
+
+    assert await with_retry(attempt) == "ok"
+    assert seen == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_with_retry_reraises_after_last_attempt():
+    """Verify that the last failure propagates, and other errors aren't retried."""
+
+    async def always_invalid(n):
+        raise InvalidResponseError()
+
+    with pytest.raises(InvalidResponseError):
+        await with_retry(always_invalid, attempts=2)
+
+    calls = []
+
+    async def broken(n):
+        calls.append(n)
+        raise KeyError("bug")
+
+    with pytest.raises(KeyError):
+        await with_retry(broken)
+    assert calls == [0]
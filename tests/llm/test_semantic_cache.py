@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import create_engine
+
+from plg.llm.semantic_cache import SemanticCache, make_namespace
+
+
+@pytest.fixture
+def engine():
+    """A throwaway in-memory database shared across sessions."""
+    return create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+
+
+def test_similar_prompts_hit_and_dissimilar_prompts_miss(engine):
+    """Only embeddings above the similarity threshold return a response."""
+    cache = SemanticCache(engine=engine, threshold=0.9)
+    namespace = make_namespace("model-a", "Tag decisions.")
+    cache.set(namespace, "Write a novel.", [1.0, 0.0], '{"content": "hit"}')
+
+    assert cache.get(namespace, [0.95, 0.1]) == '{"content": "hit"}'
+    assert cache.get(namespace, [0.0, 1.0]) is None
+    assert cache.get(make_namespace("model-b"), [1.0, 0.0]) is None
+
+
+def test_entries_persist_across_instances(engine):
+    """A new cache instance reads the entries stored by a previous one."""
+    namespace = make_namespace("model-a")
+    SemanticCache(engine=engine).set(namespace, "p", [0.0, 2.0], '{"content": "x"}')
+
+    assert SemanticCache(engine=engine).get(namespace, [0.0, 1.0]) == (
+        '{"content": "x"}'
+    )
@@ -0,0 +1,48 @@
+from plg.models.models import BranchNode, Decision
+from plg.models.queries import count_subtree, load_subtree
+
+
+def test_load_subtree_returns_descendants_only(db_session):
+    """
+    Verify that load_subtree loads a node's descendants with their decisions
+    and leaves unrelated nodes out.
+    """
+    root = BranchNode(decision=Decision(text="Root"))
+    child = BranchNode(decision=Decision(text="Child"), parent=root)
+    BranchNode(decision=Decision(text="Grandchild"), parent=child)
+    BranchNode(decision=Decision(text="Unrelated"))
+    db_session.add(root)
+    db_session.commit()
+    child_id = child.id
+    db_session.expunge_all()
+
+    subtree = load_subtree(db_session, child_id)
+
+    assert subtree is not None
+    assert subtree.root.decision.text == "Child"
+    assert [n.decision.text for n in subtree.children(subtree.root)] == [
+        "Grandchild"
+    ]
+    assert len(subtree.nodes) == 2
+
+
+def test_load_subtree_returns_none_for_missing_node(db_session):
+    """Verify that load_subtree returns None for an unknown start node."""
+    assert load_subtree(db_session, 42) is None
+
+
+def test_count_subtree_counts_descendants_only(db_session):
+    """
+    Verify that count_subtree counts a node and its descendants, and
+    returns 0 for an unknown node.
+    """
+    root = BranchNode(decision=Decision(text="Root"))
+    child = BranchNode(decision=Decision(text="Child"), parent=root)
+    BranchNode(decision=Decision(text="Grandchild"), parent=child)
+    BranchNode(decision=Decision(text="Unrelated"))
+    db_session.add(root)
+    db_session.commit()
+
+    assert count_subtree(db_session, root.id) == 3
+    assert count_subtree(db_session, child.id) == 2
+    assert count_subtree(db_session, 42) == 0
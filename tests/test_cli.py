@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from plg.cli import _replace_on_success
+
+
+def test_replace_on_success_replaces_the_file(tmp_path):
+    """
+    Verify that a completed write replaces the file with the usual
+    permissions and leaves no temp file.
+    """
+    path = tmp_path / "tree.md"
+    path.write_text("old")
+    umask = os.umask(0)
+    os.umask(umask)
+
+    with _replace_on_success(path) as sink:
+        sink.write("new")
+
+    assert path.read_text() == "new"
+    assert list(tmp_path.iterdir()) == [path]
+    assert path.stat().st_mode & 0o777 == 0o666 & ~umask
+
+
+def test_replace_on_success_keeps_the_file_on_failure(tmp_path):
+    """
+    Verify that a write that fails partway leaves the existing file intact
+    and cleans up its temp file.
+    """
+    path = tmp_path / "tree.md"
+    path.write_text("old")
+
+    with pytest.raises(RuntimeError):
+        with _replace_on_success(path) as sink:
+            sink.write("partial")
+            raise RuntimeError("LLM call failed")
+
+    assert path.read_text() == "old"
+    assert list(tmp_path.iterdir()) == [path]
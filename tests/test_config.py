@@ -0,0 +1,51 @@
+import pytest
+
+from plg.config import Settings
+
+
+def test_settings_from_env_prefers_environment_over_file(monkeypatch, tmp_path):
+    """
+    Verify that environment variables override values from the .env file,
+    and that unset fields fall back to their defaults.
+    """
+    env_file = tmp_path / ".env"
+    env_file.write_text('OPENAI_API_KEY="file-key"\nMODEL_NAME="file-model"\n')
+    monkeypatch.setenv("MODEL_NAME", "env-model")
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+
+    settings = Settings.from_env(str(env_file))
+
+    assert settings.OPENAI_API_KEY.get_secret_value() == "file-key"
+    assert settings.MODEL_NAME == "env-model"
+    assert settings.LLM_PROVIDER == "openai"
+
+
+def test_settings_from_env_requires_api_key(monkeypatch, tmp_path):
+    """Verify that a missing OPENAI_API_KEY raises a clear error."""
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+
+    with pytest.raises(ValueError) as excinfo:
+        Settings.from_env(str(tmp_path / ".env"))
+
+    assert "OPENAI_API_KEY is not set" in str(excinfo.value)
+
+
+def test_settings_from_env_parses_boolean_fields(monkeypatch, tmp_path):
+    """
+    Verify that boolean settings accept common spellings, default to off,
+    and reject anything else.
+    """
+    monkeypatch.setenv("OPENAI_API_KEY", "env-key")
+    monkeypatch.delenv("SEMANTIC_CACHE_ENABLED", raising=False)
+    env_file = str(tmp_path / ".env")
+
+    assert Settings.from_env(env_file).SEMANTIC_CACHE_ENABLED is False
+
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "Yes")
+    assert Settings.from_env(env_file).SEMANTIC_CACHE_ENABLED is True
+
+    monkeypatch.setenv("SEMANTIC_CACHE_ENABLED", "maybe")
+    with pytest.raises(ValueError) as excinfo:
+        Settings.from_env(env_file)
+    assert "SEMANTIC_CACHE_ENABLED must be true or false" in str(excinfo.value)
@@ -0,0 +1,224 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from openai.types.chat import ChatCompletionMessage
+
+from plg.llm.prompts import STRICT_JSON_SUFFIX
+from plg.models.models import Decision
+from plg.tools import analysis
+from plg.tools.analysis import annotate_branch, annotate_decision, annotate_decisions
+
+
+@pytest.fixture(autouse=True)
+def clear_annotation_cache():
+    """Ensures each test starts with an empty in-process annotation cache."""
+    analysis._annotation_cache.clear()
+    yield
+    analysis._annotation_cache.clear()
+
+
+@pytest.fixture
+def mock_llm_client(monkeypatch):
+    """Patches the LLM client used by the analysis tools."""
+    client = MagicMock()
+    client.acomplete = AsyncMock(
+        return_value=ChatCompletionMessage(
+            role="assistant",
+            content=json.dumps({"risk": "Low", "growth": "High", "emotion": "Calm"}),
+        )
+    )
+    monkeypatch.setattr("plg.tools.analysis.get_llm_client", lambda: client)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_annotate_branch_memoizes_identical_texts(mock_llm_client):
+    """
+    Verify that annotating the same text twice only calls the LLM once.
+    """
+    first = await annotate_branch("Move to Lisbon.")
+    second = await annotate_branch("Move to Lisbon.")
+
+    assert first == second == {"risk": "Low", "growth": "High", "emotion": "Calm"}
+    mock_llm_client.acomplete.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_annotate_decision_reuses_persisted_tags(mock_llm_client):
+    """
+    Verify that a decision with persisted tags is not re-annotated.
+    """
+    decision = Decision(text="Stay put.", tags={"risk": "Medium"})
+
+    annotations = await annotate_decision(decision)
+
+    assert annotations == {"risk": "Medium"}
+    mock_llm_client.acomplete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_annotate_decision_writes_back_on_miss(mock_llm_client):
+    """
+    Verify that a decision without tags is annotated and the result stored.
+    """
+    decision = Decision(text="Start a bakery.")
+
+    annotations = await annotate_decision(decision)
+
+    assert annotations["risk"] == "Low"
+    assert decision.tags == annotations
+    mock_llm_client.acomplete.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_annotate_decisions_uses_one_bulk_call(mock_llm_client):
+    """
+    Verify that several unannotated decisions are annotated with a single
+    LLM call and that duplicate texts are only sent once.
+    """
+    mock_llm_client.acomplete.return_value = ChatCompletionMessage(
+        role="assistant",
+        content=json.dumps({"annotations": [{"risk": "Low"}, {"risk": "High"}]}),
+    )
+    decisions = [Decision(text="A"), Decision(text="B"), Decision(text="A")]
+
+    annotations = await annotate_decisions(decisions)
+
+    assert annotations == [{"risk": "Low"}, {"risk": "High"}, {"risk": "Low"}]
+    assert decisions[2].tags == {"risk": "Low"}
+    mock_llm_client.acomplete.assert_called_once()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "bulk_content", ["not json", '[{"risk": "Low"}, {"risk": "High"}]']
+)
+async def test_annotate_decisions_falls_back_to_single_calls(
+    mock_llm_client, monkeypatch, bulk_content
+):
+    """
+    Verify that a bulk response that stays unusable after its strict retry,
+    including a bare array instead of the schema's object, falls back to
+    per-decision calls.
+    """
+    monkeypatch.setattr("plg.llm.retry.asyncio.sleep", AsyncMock())
+    bulk = ChatCompletionMessage(role="assistant", content=bulk_content)
+    single = ChatCompletionMessage(role="assistant", content='{"risk": "Medium"}')
+    mock_llm_client.acomplete.side_effect = [bulk, bulk, single, single]
+    decisions = [Decision(text="A"), Decision(text="B")]
+
+    annotations = await annotate_decisions(decisions)
+
+    assert annotations == [{"risk": "Medium"}, {"risk": "Medium"}]
+    assert mock_llm_client.acomplete.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_annotate_decisions_retries_bulk_with_strict_prompt(
+    mock_llm_client, monkeypatch
+):
+    """
+    Verify that a bulk response of the wrong length is retried once with a
+    stricter prompt, whose reply is cached under the original prompt.
+    """
+    monkeypatch.setattr("plg.llm.retry.asyncio.sleep", AsyncMock())
+    mock_llm_client.acomplete.side_effect = [
+        ChatCompletionMessage(
+            role="assistant", content='{"annotations": [{"risk": "Low"}]}'
+        ),
+        ChatCompletionMessage(
+            role="assistant",
+            content='{"annotations": [{"risk": "Low"}, {"risk": "High"}]}',
+        ),
+    ]
+    decisions = [Decision(text="A"), Decision(text="B")]
+
+    annotations = await annotate_decisions(decisions)
+
+    assert annotations == [{"risk": "Low"}, {"risk": "High"}]
+    first_call, retry_call = mock_llm_client.acomplete.call_args_list
+    assert retry_call.kwargs["prompt"].endswith(STRICT_JSON_SUFFIX)
+    assert retry_call.kwargs["cache_prompt"] == first_call.kwargs["prompt"]
+    # The wrong-length reply is rejected, so the client never caches it.
+    validate = first_call.kwargs["validate"]
+    assert validate('{"annotations": [{"risk": "Low"}]}') is False
+
+
+@pytest.mark.asyncio
+async def test_annotate_decisions_chunks_large_batches(mock_llm_client, monkeypatch):
+    """
+    Verify that bulk annotation splits many texts into fixed-size requests.
+    """
+    monkeypatch.setattr(analysis, "_BULK_CHUNK_SIZE", 2)
+    mock_llm_client.acomplete.side_effect = [
+        ChatCompletionMessage(
+            content='{"annotations": [{"risk": "Low"}, {"risk": "Low"}]}',
+            role="assistant",
+        ),
+        ChatCompletionMessage(
+            content='{"annotations": [{"risk": "High"}]}', role="assistant"
+        ),
+    ]
+    decisions = [Decision(text=text) for text in ("A", "B", "C")]
+
+    annotations = await annotate_decisions(decisions)
+
+    assert annotations == [{"risk": "Low"}, {"risk": "Low"}, {"risk": "High"}]
+    assert mock_llm_client.acomplete.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_annotate_branch_coalesces_concurrent_requests(mock_llm_client):
+    """
+    Verify that concurrent annotations of the same text share one LLM call.
+    """
+    results = await asyncio.gather(
+        *[annotate_branch("Learn to sail.") for _ in range(3)]
+    )
+
+    assert results[0] == results[1] == results[2]
+    mock_llm_client.acomplete.assert_called_once()
+    assert analysis._inflight == {}
+
+
+@pytest.mark.asyncio
+async def test_annotate_decisions_force_reannotate_ignores_saved_tags(
+    mock_llm_client,
+):
+    """
+    Verify that force_reannotate sends decisions with saved tags to the LLM.
+    """
+    mock_llm_client.acomplete.return_value = ChatCompletionMessage(
+        role="assistant", content=json.dumps({"annotations": [{"risk": "High"}]})
+    )
+    decision = Decision(text="A", tags={"risk": "Low"})
+
+    annotations = await annotate_decisions([decision], force_reannotate=True)
+
+    assert annotations == [{"risk": "High"}]
+    assert decision.tags == {"risk": "High"}
+    mock_llm_client.acomplete.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_annotate_branch_retries_with_strict_prompt(mock_llm_client, monkeypatch):
+    """
+    Verify that an unparseable tag response is retried with a stricter prompt,
+    whose reply is cached under the original prompt.
+    """
+    monkeypatch.setattr("plg.llm.retry.asyncio.sleep", AsyncMock())
+    mock_llm_client.acomplete.side_effect = [
+        ChatCompletionMessage(role="assistant", content="Sure! Here are the tags."),
+        ChatCompletionMessage(role="assistant", content='{"risk": "Low"}'),
+    ]
+
+    annotations = await annotate_branch("Open a bakery.")
+
+    assert annotations == {"risk": "Low"}
+    first_call, retry_call = mock_llm_client.acomplete.call_args_list
+    assert retry_call.kwargs["prompt"].endswith(STRICT_JSON_SUFFIX)
+    assert retry_call.kwargs["use_cache"] is True
+    assert retry_call.kwargs["use_semantic_cache"] is False
+    assert retry_call.kwargs["cache_prompt"] == first_call.kwargs["prompt"]
@@ -0,0 +1,69 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from openai.types.chat import ChatCompletionMessage
+
+from plg.models.models import ContextBlock
+from plg.tools.branching import generate_branches_with_annotations
+
+
+@pytest.mark.asyncio
+async def test_generate_branches_with_annotations_uses_one_call(monkeypatch):
+    """
+    Verify that branches and their tags come from a single LLM call, and that
+    malformed tags are replaced with empty ones.
+    """
+    client = MagicMock()
+    client.acomplete = AsyncMock(
+        return_value=ChatCompletionMessage(
+            role="assistant",
+            content=json.dumps(
+                {
+                    "branches": [
+                        {
+                            "decision": "Teach workshops",
+                            "tradeoffs": ["+ Income"],
+                            "tags": {"risk": "Low"},
+                        },
+                        {"decision": "Apply for an MFA", "tradeoffs": [], "tags": 3},
+                    ]
+                }
+            ),
+        )
+    )
+    monkeypatch.setattr("plg.tools.branching.get_llm_client", lambda: client)
+
+    branches = await generate_branches_with_annotations(
+        "Write a novel.", [ContextBlock(role="core_desire", text="Write.")], 2
+    )
+
+    assert [branch["tags"] for branch in branches] == [{"risk": "Low"}, {}]
+    client.acomplete.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_generate_branches_rejects_bare_arrays(monkeypatch):
+    """
+    Verify that a bare array instead of the schema's object is treated as an
+    unusable response and retried with the stricter prompt.
+    """
+    monkeypatch.setattr("plg.llm.retry.asyncio.sleep", AsyncMock())
+    branch = {"decision": "Teach workshops", "tradeoffs": [], "tags": {}}
+    client = MagicMock()
+    client.acomplete = AsyncMock(
+        side_effect=[
+            ChatCompletionMessage(role="assistant", content=json.dumps([branch])),
+            ChatCompletionMessage(
+                role="assistant", content=json.dumps({"branches": [branch]})
+            ),
+        ]
+    )
+    monkeypatch.setattr("plg.tools.branching.get_llm_client", lambda: client)
+
+    branches = await generate_branches_with_annotations(
+        "Write a novel.", [ContextBlock(role="core_desire", text="Write.")], 1
+    )
+
+    assert [b["decision"] for b in branches] == ["Teach workshops"]
+    assert client.acomplete.call_count == 2
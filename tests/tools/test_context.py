@@ -0,0 +1,24 @@
+from plg.models.models import ContextBlock
+from plg.tools import context
+from plg.tools.context import format_context
+
+
+def test_format_context_formats_and_memoizes_blocks():
+    """
+    Verify that context blocks become prompt bullets, and that formatting
+    equal blocks again is served from the memo.
+    """
+    context._format_context_items.cache_clear()
+    blocks = [
+        ContextBlock(role="core_desire", text="Write full-time."),
+        ContextBlock(role="key_constraints", text="Keep my income."),
+    ]
+
+    first = format_context(blocks)
+    second = format_context([ContextBlock(role=b.role, text=b.text) for b in blocks])
+
+    assert first == (
+        "- Core Desire: Write full-time.\n- Key Constraints: Keep my income."
+    )
+    assert second == first
+    assert context._format_context_items.cache_info().hits == 1
@@ -0,0 +1,96 @@
+import sys
+
+import pytest
+from sqlalchemy import event
+
+from plg.models.models import BranchNode, Decision
+from plg.tools.show import _get_compact_tradeoffs, generate_tree_view
+
+
+@pytest.mark.asyncio
+async def test_generate_tree_view_loads_tree_with_one_query(db_session):
+    """
+    Verify that the tree view renders every node while querying the
+    database only once.
+    """
+    root = BranchNode(decision=Decision(text="Root", summary="Burnt out."))
+    child = BranchNode(
+        decision=Decision(text="Go freelance", tags={"risk": "High"}),
+        parent=root,
+    )
+    BranchNode(decision=Decision(text="Find a first client"), parent=child)
+    db_session.add(root)
+    db_session.commit()
+    root_id = root.id
+    db_session.expunge_all()
+
+    # The savepoints of the test transaction are not queries.
+    statements = []
+    event.listen(
+        db_session.bind,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    tree = await generate_tree_view(root_id, db_session)
+
+    queries = [s for s in statements if not s.startswith(("SAVEPOINT", "RELEASE"))]
+    assert len(queries) == 1, statements
+    [child_branch] = tree.children[0].children
+    assert "Go freelance" in child_branch.label
+    assert "[Risk: High]" in child_branch.label
+    assert "Find a first client" in child_branch.children[0].label
+
+
+@pytest.mark.parametrize(
+    "tradeoffs, expected",
+    [
+        (("- Risky", "+ Freedom", "+ Growth"), ("✔ Freedom", "✘ Risky")),
+        (("+ Freedom", "+ Growth", "+ Fun"), ("✔ Freedom", "✔ Growth")),
+        (("- Risky", "- Lonely"), ("✘ Risky",)),
+        (("Neutral",), ()),
+    ],
+)
+def test_get_compact_tradeoffs(tradeoffs, expected):
+    """
+    Verify that the compact view keeps the first pro and con, falling back
+    to a second pro when there is no con.
+    """
+    assert _get_compact_tradeoffs(tradeoffs) == expected
+
+
+@pytest.mark.asyncio
+async def test_generate_tree_view_handles_trees_deeper_than_recursion_limit(
+    db_session,
+):
+    """
+    Verify that a chain of nodes deeper than the recursion limit renders,
+    with every node in place.
+    """
+    depth = sys.getrecursionlimit() + 100
+    root = node = BranchNode(decision=Decision(text="Step 0"))
+    for i in range(1, depth):
+        node = BranchNode(decision=Decision(text=f"Step {i}"), parent=node)
+    db_session.add(root)
+    db_session.commit()
+
+    tree = await generate_tree_view(root.id, db_session)
+
+    branch = tree.children[0]
+    for _ in range(depth - 1):
+        [branch] = branch.children
+    assert f"Step {depth - 1}" in branch.label
+
+
+@pytest.mark.asyncio
+async def test_generate_tree_view_renders_a_lone_root(db_session):
+    """Verify that a start node without children renders as its root label."""
+    root = BranchNode(decision=Decision(text="Root", summary="Burnt out."))
+    db_session.add(root)
+    db_session.commit()
+
+    tree = await generate_tree_view(root.id, db_session)
+
+    [root_branch] = tree.children
+    assert "Root Context" in root_branch.label
+    assert "Burnt out." in root_branch.label
+    assert root_branch.children == []
@@ -0,0 +1,140 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlmodel import select
+
+from plg.models.models import BranchNode, ContextBlock, Decision
+from plg.tools.exceptions import MaxNodesExceededError
+from plg.tools.tree import expand_tree_bfs
+
+
+@pytest.fixture
+def session(db_session):
+    """Provides a session on the test database holding one root decision."""
+    root = Decision(
+        text="Root",
+        context_blocks=[ContextBlock(role="core_desire", text="Write.")],
+    )
+    db_session.add(root)
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def mock_llm_tools(monkeypatch):
+    """
+    Patches the fused branch generation, recording how many parents were
+    being expanded at the same time.
+    """
+    state = {"active": 0, "peak": 0}
+
+    async def generate_branches(parent_summary, context_blocks, max_children):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0)
+        state["active"] -= 1
+        return [
+            {
+                "decision": f"{parent_summary}/{i}",
+                "tradeoffs": ["+ Fun"],
+                "tags": {"risk": "Low"},
+            }
+            for i in range(max_children)
+        ]
+
+    monkeypatch.setattr(
+        "plg.tools.tree.generate_branches_with_annotations", generate_branches
+    )
+    monkeypatch.setattr("plg.tools.tree.annotate_decisions", AsyncMock())
+    return state
+
+
+@pytest.mark.asyncio
+async def test_expand_tree_bfs_expands_each_level_concurrently(session, mock_llm_tools):
+    """
+    Verify that every level is fully expanded and that the parents of a
+    level are expanded concurrently.
+    """
+    await expand_tree_bfs(1, max_depth=2, max_children=2, session=session)
+
+    texts = sorted(session.exec(select(Decision.text)).all())
+    assert texts == [
+        "Root",
+        "Root/0",
+        "Root/0/0",
+        "Root/0/1",
+        "Root/1",
+        "Root/1/0",
+        "Root/1/1",
+    ]
+    assert len(session.exec(select(BranchNode)).all()) == 7
+    assert mock_llm_tools["peak"] == 2
+    assert session.exec(
+        select(Decision).where(Decision.text == "Root/1")
+    ).one().tags == {"risk": "Low"}
+
+
+@pytest.mark.asyncio
+async def test_expand_tree_bfs_saves_progress_at_node_limit(session, mock_llm_tools):
+    """
+    Verify that hitting the node limit raises after saving the nodes that fit.
+    """
+    with pytest.raises(MaxNodesExceededError):
+        await expand_tree_bfs(1, max_depth=5, max_children=4, session=session)
+
+    assert len(session.exec(select(BranchNode)).all()) == 50
+
+
+@pytest.mark.asyncio
+async def test_expand_tree_bfs_with_zero_depth_adds_nothing(session, mock_llm_tools):
+    """Verify that a zero depth creates the start node without expanding it."""
+    await expand_tree_bfs(1, max_depth=0, max_children=2, session=session)
+
+    assert len(session.exec(select(BranchNode)).all()) == 1
+    assert mock_llm_tools["peak"] == 0
+
+
+@pytest.mark.asyncio
+async def test_expand_tree_bfs_annotates_untagged_children_per_level(
+    session, monkeypatch
+):
+    """
+    Verify that children with malformed tags are annotated with one call per
+    level, covering every parent of the level.
+    """
+
+    async def generate_branches(parent_summary, context_blocks, max_children):
+        return [
+            {"decision": f"{parent_summary}/{i}", "tradeoffs": [], "tags": {}}
+            for i in range(max_children)
+        ]
+
+    async def annotate(decisions, max_workers=8):
+        for decision in decisions:
+            decision.tags = {"risk": "High"}
+
+    annotate_decisions = AsyncMock(side_effect=annotate)
+    monkeypatch.setattr(
+        "plg.tools.tree.generate_branches_with_annotations", generate_branches
+    )
+    monkeypatch.setattr("plg.tools.tree.annotate_decisions", annotate_decisions)
+
+    await expand_tree_bfs(1, max_depth=2, max_children=2, session=session)
+
+    assert [len(call.args[0]) for call in annotate_decisions.await_args_list] == [2, 4]
+    assert session.exec(
+        select(Decision).where(Decision.text == "Root/1/0")
+    ).one().tags == {"risk": "High"}
+
+
+@pytest.mark.asyncio
+async def test_expand_tree_bfs_opens_its_own_session(session, mock_llm_tools):
+    """
+    Verify that without a session, the expansion writes through get_session,
+    which the test database fixture points at the test's transaction.
+    """
+    await expand_tree_bfs(1, max_depth=1, max_children=2, session=None)
+
+    texts = sorted(session.exec(select(Decision.text)).all())
+    assert texts == ["Root", "Root/0", "Root/1"]